@@ -1,8 +1,11 @@
 # Mold for large cube tray
 
-import Part, PartDesignGui
-import Mesh, MeshPart, MeshPartGui
+import Part
 import math
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stl_export import exportSTL
 
 
 ########################################################
@@ -157,17 +160,7 @@ box = box.fuse(cubes)
 
 # export stl for slicing.
 
-docName = 'moldForSilicone'
-doc = FreeCAD.newDocument(docName) 
-App.setActiveDocument(docName)
-
-
-meshBox = doc.addObject("Mesh::Feature","MeshBox")
-meshBox.Mesh = MeshPart.meshFromShape(Shape=box, 
-	   LinearDeflection=0.1, AngularDeflection=0.523599, Relative=False)
-meshBox.Label= "moldForSilicone  (Meshed)"
-meshBox.ViewObject.CreaseAngle=25.0
-Mesh.export([meshBox], "./" + "moldForSilicone.stl")
+exportSTL(box, "./" + "moldForSilicone.stl")
 
 
 #######################################
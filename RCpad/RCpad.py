@@ -1,7 +1,11 @@
-import Part, Mesh, MeshPart
+import Part
 #import math
+import os, sys
 from FreeCAD import Vector
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stl_export import exportSTL
+
 #https://www.freecadweb.org/wiki/Part_API
 #https://www.freecadweb.org/wiki/TopoShape_API
 #https://www.freecadweb.org/wiki/Topological_data_scripting#Rotating_a_shape
@@ -17,14 +21,7 @@ def makeSTL(shp,  f) :
    
    FreeCAD.Console.PrintMessage('generating stl file.\n')
 
-   m = MeshPart.meshFromShape(Shape=shp, 
-          LinearDeflection=0.1, AngularDeflection=0.523599, Relative=False)
-   
-   #mesh.ViewObject.CreaseAngle=25.0
-
-   #Mesh.export([m], "./BT-" + f + ".stl")
-   Mesh.export([m],  f + ".stl")
-   m.write(Filename = f + ".stl")
+   exportSTL(shp, f + ".stl")
    return None
 
 
@@ -0,0 +1,109 @@
+# Pack a directory of airfoil coordinate files into one indexed binary
+# archive, and open profiles from it by name as memory-mapped arrays.
+#
+# e.g. (packing parses with airfoil_parse.parseAirfoil, NumPy only)
+#  python3 airfoil_archive.py pack airfoils.afa /home/paul/CAD/foil
+#  python3 airfoil_archive.py list airfoils.afa
+#
+#  a = airfoilArchive("airfoils.afa")
+#  dat = a.profileDAT("H105Coord")       # (N,2) float32, no copy
+#  z = surf_foil.foil(file_profile="airfoils.afa", profileName="H105Coord",
+#                     file_LeadTrail="test.sweepPath")
+#
+# Layout, little endian:
+#  header  32 bytes: magic b"AFOILARC", uint32 version, uint32 count,
+#                    uint64 index offset, uint64 index length
+#  data    one float32 (N,2) block per profile, 16 byte aligned
+#  index   JSON {name: {"offset", "points", "doc", "format", "source"}}
+
+import json, os, struct, sys
+import numpy as np
+
+MAGIC   = b"AFOILARC"
+VERSION = 1
+HEADER  = struct.Struct("<8sIIQQ")
+
+
+def packArchive(archive, sources):
+   '''
+   Write the profiles in files sources (parsed and normalized with
+   airfoil_parse.parseAirfoil) to archive. Profiles are named by file name
+   without extension. Returns the number of profiles packed.
+   '''
+   from airfoil_parse import parseAirfoil
+
+   index = {}
+   with open(archive, "wb") as f:
+      f.write(b"\0" * HEADER.size)
+      for fn in sources:
+         name = os.path.splitext(os.path.basename(fn))[0]
+         if name in index : raise ValueError("duplicate profile name " + name)
+         prof, doc, fmt = parseAirfoil(fn)
+         pad = -f.tell() % 16
+         f.write(b"\0" * pad)
+         index[name] = {"offset": f.tell(), "points": len(prof), "doc": doc,
+                        "format": fmt, "source": os.path.abspath(fn)}
+         f.write(np.ascontiguousarray(prof, dtype="<f4").tobytes())
+      js = json.dumps(index).encode("utf-8")
+      offset = f.tell()
+      f.write(js)
+      f.seek(0)
+      f.write(HEADER.pack(MAGIC, VERSION, len(index), offset, len(js)))
+   return(len(index))
+
+
+class airfoilArchive():
+   '''
+   Read only, memory-mapped airfoil archive written by packArchive.
+   Coordinate arrays are views of the mapping, not copies.
+   '''
+   def __init__(self, archive):
+      self.archive = archive
+      self.mm = np.memmap(archive, dtype=np.uint8, mode="r")
+      magic, version, count, offset, length = HEADER.unpack(
+                                          self.mm[:HEADER.size].tobytes())
+      if magic != MAGIC or version != VERSION :
+         raise ValueError(str(archive) + " is not an airfoil archive (version %d)"
+                          % VERSION)
+      self.index = json.loads(self.mm[offset:offset + length].tobytes())
+
+   def names(self):
+      return(sorted(self.index))
+
+   def profileDAT(self, name):
+      """(N,2) float32 array of the normalized closed profile, memory-mapped."""
+      e = self.index[name]
+      a = self.mm[e["offset"]:e["offset"] + 8 * e["points"]]
+      return(a.view("<f4").reshape(e["points"], 2))
+
+   def doc(self, name):
+      """Header lines of the source file, as lists of tokens."""
+      return(self.index[name]["doc"])
+
+
+def main(argv=None):
+   argv = sys.argv[1:] if argv is None else argv
+   if len(argv) >= 3 and argv[0] == "pack" :
+      sources = []
+      for d in argv[2:]:
+         if os.path.isdir(d) :
+            sources += sorted(os.path.join(d, f) for f in os.listdir(d)
+                              if f.lower().endswith(".dat"))
+         else :
+            sources.append(d)
+      print(packArchive(argv[1], sources), "profiles packed in", argv[1])
+   elif len(argv) == 2 and argv[0] == "list" :
+      a = airfoilArchive(argv[1])
+      for n in a.names():
+         e = a.index[n]
+         print("%-24s %5d %-9s %s" % (n, e["points"], e["format"],
+               " ".join(e["doc"][0]) if e["doc"] else ""))
+   else :
+      print("usage: airfoil_archive.py pack ARCHIVE DIR|FILE.dat ...\n"
+            "       airfoil_archive.py list ARCHIVE")
+      return(2)
+   return(0)
+
+
+if __name__ == "__main__":
+   sys.exit(main())
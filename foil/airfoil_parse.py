@@ -0,0 +1,130 @@
+# Airfoil profile (.dat) and sweep path (.sweepPath) file parsing, with
+# NumPy only (no FreeCAD), so files can be read and packed (airfoil_archive.py)
+# outside FreeCAD. surf_foil.py imports these.
+#
+#  prof, doc, fmt = parseAirfoil("H105Coord.dat")   # normalized (N,2)
+#  lt, doc = loadArray("test.sweepPath", 6, maxcol=7)
+
+import numpy as np
+
+
+def _numbers(tok, ncol):
+   # the first ncol tokens as floats, None if there are not ncol numbers
+   try :
+      return([float(b) for b in tok[:ncol]] if len(tok) >= ncol else None)
+   except ValueError :
+      return(None)
+
+
+def loadArray(source, ncol, maxcol=None):
+   '''
+   Read the numeric block of a profile (.dat) or sweep path (.sweepPath) file.
+   Header lines before the first line with ncol numbers are returned as doc
+   (a list of token lists, as before). The rest of the file is parsed in one
+   pass into a contiguous (N, ncol) float64 array. If any later line is not
+   numeric (e.g. a trailing comment or "end") the rest is read line by line
+   instead, and such lines are added to doc. Extra columns are ignored,
+   unless maxcol is given, in which case up to maxcol columns are read if
+   the first numeric line has them.
+   e.g.
+   dat, doc = loadArray("H105Coord.dat", 2)
+   lt,  doc = loadArray("test.sweepPath", 6)
+   '''
+   with open(source) as f:
+      lines = f.read().splitlines()
+   
+   doc = []
+   start = len(lines)
+   for i, ln in enumerate(lines):
+      tok = ln.split()
+      if _numbers(tok, ncol) is not None :
+         start = i
+         break
+      doc.append(tok)
+   
+   if maxcol is not None and start < len(lines) :
+      for b in lines[start].split()[ncol:maxcol]:
+         try :
+            float(b)
+         except ValueError :
+            break
+         ncol += 1
+   
+   try :
+      data = np.loadtxt(lines[start:], dtype=np.float64, usecols=range(ncol), 
+                        ndmin=2)
+   except ValueError :
+      rows = []
+      for ln in lines[start:]:
+         tok = ln.split()
+         row = _numbers(tok, ncol)
+         if row is not None : rows.append(row)
+         elif tok : doc.append(tok)
+      data = np.array(rows, dtype=np.float64)
+   return(np.ascontiguousarray(data.reshape(-1, ncol)), doc)
+
+
+def normalizeProfile(prof):
+   '''
+   Normalize a closed profile contour: leading edge (minimum X) at the 
+   origin, trailing edge (mid point of the first and last points) on the
+   +X axis at 1, ordered trailing edge, upper surface, leading edge, lower
+   surface (counter clockwise), and closed (last point equal to first).
+   '''
+   prof = np.asarray(prof, dtype=np.float64)[:, 0:2]
+   # counter clockwise, by the sign of the shoelace area
+   x, y = prof[:, 0], prof[:, 1]
+   if np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) < 0.0 : prof = prof[::-1]
+   le = prof[int(np.argmin(prof[:, 0]))]
+   d  = 0.5 * (prof[0] + prof[-1]) - le
+   cord = np.hypot(d[0], d[1])
+   c, s = d / cord
+   rot = np.array([[c, -s], [s, c]])      # rotate by -angle of the cord
+   prof = (prof - le) @ rot / cord
+   if not np.allclose(prof[0], prof[-1]) : prof = np.vstack((prof, prof[0]))
+   else : prof[-1] = prof[0]
+   return(np.ascontiguousarray(prof))
+
+
+def parseAirfoil(source):
+   '''
+   Read an airfoil coordinate file, detecting the format:
+    Selig    - name line(s), then X Y from trailing edge over the upper
+               surface to the leading edge and back over the lower surface.
+    Lednicer - name line, a line with the number of upper and lower points
+               (e.g. "61. 61."), then the upper and lower surfaces each from
+               leading edge to trailing edge, usually separated by blank lines.
+   Values may be separated by white space and/or commas. The file is read
+   line by line. Returns (profile, doc, format) where profile is the 
+   normalized closed contour (see normalizeProfile) as an (N,2) array and
+   doc the non-numeric lines as lists of tokens.
+   '''
+   doc = []
+   rows = []
+   counts = None
+   with open(source) as f:
+      for line in f:
+         tok = line.replace(",", " ").split()
+         try :
+            xy = (float(tok[0]), float(tok[1]))
+         except (ValueError, IndexError) :
+            if tok : doc.append(tok)
+            continue
+         # a first numeric line of two counts > 1 is a Lednicer header
+         if not rows and counts is None and xy[0] > 1.5 and xy[1] > 1.5 \
+               and xy[0] == int(xy[0]) and xy[1] == int(xy[1]) :
+            counts = (int(xy[0]), int(xy[1]))
+            continue
+         rows.append(xy)
+   
+   if len(rows) < 3 : raise ValueError("no airfoil coordinates in " + str(source))
+   rows = np.array(rows, dtype=np.float64)
+   if counts is not None :
+      upper = rows[:counts[0]]
+      lower = rows[counts[0]:counts[0] + counts[1]]
+      if np.allclose(upper[0], lower[0]) : lower = lower[1:]
+      rows = np.vstack((upper[::-1], lower))
+      fmt = "Lednicer"
+   else :
+      fmt = "Selig"
+   return(normalizeProfile(rows), doc, fmt)
@@ -0,0 +1,171 @@
+# Headless batch generation of foils over every profile x sweep path pair.
+#
+# e.g. (FreeCAD's lib directory must be on PYTHONPATH, or use FreeCADCmd)
+#  PYTHONPATH=/usr/lib/freecad/lib python3 foil_batch.py \
+#     --profiles H105Coord.dat HQ1.5-11.dat \
+#     --sweeps test.sweepPath test2.sweepPath test3.sweepPath \
+#     --out build --format stl brep --workers 8
+#
+# One STL and/or BREP is written per combination, named
+# <profile>_<sweepPath>.stl, plus build/manifest.json with the timings and
+# triangle counts of each result, including the foil construction stage
+# timings (see surf_foil.stageTimer) and the analytic volume and centroid
+# (see surf_foil.massProperties).
+#
+# --massError also compares the analytic mass properties with the OCC solid
+# (see surf_foil.foil.massPropertiesError, which needs the solid's volume and
+# inertia) and prints a report. For the bundled examples
+#  PYTHONPATH=/usr/lib/freecad/lib python3 foil_batch.py \
+#     --profiles H105Coord.dat HQ1.5-11.dat \
+#     --sweeps test.sweepPath test2.sweepPath test3.sweepPath \
+#     --out build --format brep --massError
+
+import argparse, functools, json, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from fork_pool import canFork, forkPool
+
+
+def stem(fn):
+   return(os.path.splitext(os.path.basename(fn))[0])
+
+
+def buildOne(profile, sweep, out, formats, engine="loft", maxDegree=1,
+             verbose=False, cache=None, decimate=None, maxTriangles=None,
+             chordError=None, massError=False):
+   '''
+   Build the foil for one profile and sweep path file and write it to
+   directory out in formats ("stl", "brep"). Returns a manifest entry.
+   maxTriangles and/or chordError set the OCC meshing deflection for STL
+   (see stl_export.adaptiveDeflection), not used with engine="mesh".
+   massError=True adds the error of the analytic mass properties against
+   the OCC solid (not with engine="mesh").
+   '''
+   import surf_foil
+
+   name = stem(profile) + "_" + stem(sweep)
+   entry = {"name": name, "profile": profile, "sweepPath": sweep,
+            "engine": engine, "maxDegree": maxDegree, "files": [],
+            "triangles": None, "seconds": {}}
+
+   t0 = time.perf_counter()
+   f  = surf_foil.foil(file_profile=profile, file_LeadTrail=sweep,
+                       maxDegree=maxDegree, engine=engine, cache=cache,
+                       verbose=verbose, decimate=decimate)
+   f.foil      # built on first access
+   entry["seconds"]["build"] = time.perf_counter() - t0
+
+   if "stl" in formats :
+      t0 = time.perf_counter()
+      fn = os.path.join(out, name + ".stl")
+      if engine == "mesh" :
+         entry["triangles"] = f.writeSTL(fn)
+      else :
+         from stl_export import exportSTL
+         entry["triangles"] = exportSTL(f.foil, fn, maxTriangles=maxTriangles,
+                                        chordError=chordError)
+      entry["files"].append(fn)
+      entry["seconds"]["stl"] = time.perf_counter() - t0
+
+   if "brep" in formats and f.foil is not None :
+      t0 = time.perf_counter()
+      fn = os.path.join(out, name + ".brep")
+      f.foil.exportBrep(fn)
+      entry["files"].append(fn)
+      entry["seconds"]["brep"] = time.perf_counter() - t0
+
+   # analytic mass properties, and optionally their error against the OCC solid
+   mp = f.massProperties()
+   entry["massProperties"] = {"volume": float(mp["volume"]),
+                              "centroid": mp["centroid"].tolist()}
+   if massError and f.foil is not None :
+      entry["massProperties"].update(
+         {k: float(v) for k, v in f.massPropertiesError().items()})
+
+   entry["stages"] = f.timings()
+   entry["decimation"] = f.decimation
+   return(entry)
+
+
+def massErrorReport(results):
+   '''
+   Lines of a table of the analytic against OCC mass property errors
+   (relative volume error, centroid error / cord, inertia error / largest
+   component) of manifest entries built with massError=True.
+   '''
+   lines = ["%-28s %12s %12s %12s %12s" % ("foil", "volume", "volumeError",
+            "centroidErr", "inertiaErr")]
+   for r in results:
+      m = r.get("massProperties", {})
+      if "volumeError" not in m : continue
+      lines.append("%-28s %12.6g %12.3e %12.3e %12.3e" % (r["name"], m["volume"],
+                   m["volumeError"], m["centroidError"], m["inertiaError"]))
+   return(lines)
+
+
+def main(argv=None):
+   p = argparse.ArgumentParser(
+          description="Build foils for every profile x sweep path combination.")
+   p.add_argument("--profiles", nargs="+", required=True,
+          help="profile .dat files")
+   p.add_argument("--sweeps", nargs="+", required=True,
+          help="leading/trailing edge .sweepPath files")
+   p.add_argument("--out", default=".", help="output directory")
+   p.add_argument("--format", nargs="+", default=["stl"],
+          choices=["stl", "brep"], help="output formats")
+   p.add_argument("--engine", default="loft", choices=["loft", "surface", "mesh"],
+          help="foil engine, mesh writes STL without OCC (no brep)")
+   p.add_argument("--maxDegree", type=int, default=1)
+   p.add_argument("--workers", type=int, default=os.cpu_count(),
+          help="number of worker processes")
+   p.add_argument("--cache", default=None,
+          help="directory of cached foil solids (BREP), reused when unchanged")
+   p.add_argument("--decimate", type=float, default=None,
+          help="distance tolerance for dropping near-linear stations")
+   p.add_argument("--maxTriangles", type=int, default=None,
+          help="STL triangle budget, the deflection is searched to meet it")
+   p.add_argument("--chordError", type=float, default=None,
+          help="STL chord error budget (largest mesh to surface distance)")
+   p.add_argument("--massError", action="store_true",
+          help="compare the analytic mass properties with the OCC solid")
+   p.add_argument("--verbose", action="store_true",
+          help="print construction stage timings as they complete")
+   a = p.parse_args(argv)
+
+   os.makedirs(a.out, exist_ok=True)
+   jobs = [(os.path.abspath(pr), os.path.abspath(sw))
+           for pr in a.profiles for sw in a.sweeps]
+
+   t0 = time.perf_counter()
+   results = []
+   args = (a.out, a.format, a.engine, a.maxDegree, a.verbose, a.cache,
+           a.decimate, a.maxTriangles, a.chordError, a.massError)
+   # forked workers (see fork_pool.py), serially where fork is not available
+   pool = forkPool(a.workers) if a.workers > 1 and canFork() else None
+   if pool is not None :
+      calls = [pool.submit(buildOne, pr, sw, *args).result for pr, sw in jobs]
+   else :
+      calls = [functools.partial(buildOne, pr, sw, *args) for pr, sw in jobs]
+   for (pr, sw), call in zip(jobs, calls):
+      try :
+         r = call()
+      except Exception as e :
+         r = {"name": stem(pr) + "_" + stem(sw), "profile": pr,
+              "sweepPath": sw, "error": repr(e)}
+      results.append(r)
+      print(r["name"], r.get("triangles"), r.get("seconds", r.get("error")))
+   if pool is not None : pool.shutdown()
+
+   manifest = {"seconds": time.perf_counter() - t0, "workers": a.workers,
+               "results": results}
+   with open(os.path.join(a.out, "manifest.json"), "w") as f:
+      json.dump(manifest, f, indent=1)
+   if a.massError :
+      print("\n".join(massErrorReport(results)))
+
+   return(0 if all("error" not in r for r in results) else 1)
+
+
+if __name__ == "__main__":
+   sys.exit(main())
@@ -1,156 +1,1503 @@
 #from __future__ import unicode_literals
+import FreeCAD
 from FreeCAD import Base
 #import Draft, Part
-import Part, math
+import Part
+import numpy as np
+import hashlib, json, os, sys, time
+try :
+   import resource   # peak memory, not available on Windows
+except ImportError :
+   resource = None
+
+# airfoil_parse is in this directory (not on sys.path when run as a FreeCAD
+# macro or with FreeCADCmd) and stl_io in the directory above
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from airfoil_parse import loadArray, normalizeProfile, parseAirfoil
+from fork_pool import canFork, forkPool
+
+
+def toVectors(a, sc=1.0):
+   '''
+   Convert an (N,2) or (N,3) array to a list of FreeCAD.Vector, optionally
+   scaled by sc. (N,2) arrays are put in the X-Y plane (Z = 0). This is only
+   needed where OCC wants Vectors, e.g. for Part.BSplineCurve.interpolate.
+   '''
+   a = np.asarray(a, dtype=np.float64) * sc
+   if a.shape[1] == 2 : return([FreeCAD.Vector(x, y, 0.0) for x, y in a])
+   return([FreeCAD.Vector(x, y, z) for x, y, z in a])
+
+
+class vectorView():
+   '''
+   Read only sequence view of an (N,2) or (N,3) array as FreeCAD.Vector,
+   optionally scaled by sc. Vectors are made on demand, so no per-point
+   Python objects are kept. list(vectorView(a)) gives the same as toVectors(a).
+   '''
+   __slots__ = ("array", "sc")
+
+   def __init__(self, a, sc=1.0):
+      self.array = a
+      self.sc    = sc
+
+   def __len__(self):
+      return(len(self.array))
+
+   def __getitem__(self, i):
+      if isinstance(i, slice) : return(vectorView(self.array[i], self.sc))
+      p = self.array[i]
+      return(FreeCAD.Vector(float(p[0]) * self.sc, float(p[1]) * self.sc,
+                            float(p[2]) * self.sc if len(p) > 2 else 0.0))
+
+   def __iter__(self):
+      for i in range(len(self.array)): yield self[i]
+
+
+def _floatArray(a):
+   # float arrays (e.g. memory-mapped float32 archive profiles) are not copied
+   if a is None : return(None)
+   a = np.asarray(a)
+   return(a if a.dtype.kind == "f" else a.astype(np.float64))
+
+
+def _docLines(doc):
+   # lists of tokens (as from loadArray) to one string per line, compactly stored
+   if doc is None or isinstance(doc, tuple) : return(doc)
+   return(tuple(" ".join(t) for t in doc))
+
+
+def _docTokens(lines):
+   return(None if lines is None else [ln.split() for ln in lines])
+
+
+##########  profile resampling  ##########
+
+def _arcLength(pts):
+   return(np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(pts, axis=0), axis=1)))))
+
+
+def _cosineResample(prof, m):
+   '''
+   Resample both surfaces of prof (split at the leading edge, minimum X)
+   to m intervals each, cosine spaced in arc length so points cluster at the
+   leading and trailing edges. Returns 2m+1 points in the original order.
+   '''
+   k = int(np.argmin(prof[:, 0]))
+   out = []
+   for side in (prof[k::-1], prof[k:]):   # both start at the leading edge
+      s = _arcLength(side)
+      t = s[-1] * 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, m + 1)))
+      out.append(np.column_stack((np.interp(t, s, side[:, 0]), 
+                                  np.interp(t, s, side[:, 1]))))
+   return(np.concatenate((out[0][::-1], out[1][1:])))
+
+
+def profileError(prof, res):
+   '''
+   Maximum distance from the points of profile prof to the polyline res
+   (a resampling of prof, in the same order), divided by the cord length.
+   '''
+   prof = np.asarray(prof, dtype=np.float64)[:, 0:2]
+   res  = np.asarray(res,  dtype=np.float64)[:, 0:2]
+   cord = np.ptp(prof[:, 0])
+   # both polylines run trailing edge - leading edge - trailing edge, so 
+   # points are matched by normalized arc length on each surface
+   err = 0.0
+   kp, kr = int(np.argmin(prof[:, 0])), int(np.argmin(res[:, 0]))
+   for p, r in ((prof[kp::-1], res[kr::-1]), (prof[kp:], res[kr:])):
+      sp, sr = _arcLength(p), _arcLength(r)
+      sp, sr = sp / sp[-1], sr / sr[-1]
+      i = np.clip(np.searchsorted(sr, sp, side="right") - 1, 0, len(r) - 2)
+      a, b = r[i], r[i + 1]
+      ab = b - a
+      ln = np.sum(ab * ab, axis=1)
+      u  = np.clip(np.sum((p - a) * ab, axis=1) / np.where(ln > 0.0, ln, 1.0), 0.0, 1.0)
+      err = max(err, float(np.max(np.linalg.norm(p - (a + u[:, None] * ab), axis=1))))
+   return(err / cord)
+
+
+def resampleProfile(profileDAT, n=None, tol=1e-4):
+   '''
+   Resample a profile to the fewest cosine spaced points (at most n, 
+   default the original number) that reproduce it within tol, the maximum
+   distance divided by the cord length. If even n points are not within 
+   tol, n points are returned, or the original profile if n is not less
+   than its number of points. Returns (resampled (M,2) array, error).
+   e.g.
+   dat, err = resampleProfile(z.profileDAT(), n=41, tol=5e-4)
+   '''
+   prof = np.asarray(profileDAT, dtype=np.float64)[:, 0:2]
+   if n is None : n = len(prof)
+   hi = max(2, (n - 1) // 2)      # intervals per surface, 2m+1 points
+   lo = 2
+   best = _cosineResample(prof, hi)
+   bestErr = profileError(prof, best)
+   if bestErr > tol : 
+      if n >= len(prof) : return(prof, 0.0)
+      return(best, bestErr)
+   while lo < hi:
+      m = (lo + hi) // 2
+      r = _cosineResample(prof, m)
+      e = profileError(prof, r)
+      if e <= tol :
+         hi, best, bestErr = m, r, e
+      else :
+         lo = m + 1
+   return(best, bestErr)
+
+
+##########  NACA profiles  ##########
+
+# NACA 5 digit mean lines, by the position digit P: (m, k1), and for the 
+# reflexed mean lines (m, k1, k2/k1)
+NACA5   = {1: (0.0580, 361.400), 2: (0.1260, 51.640), 3: (0.2025, 15.957),
+           4: (0.2900, 6.643),   5: (0.3910, 3.230)}
+NACA5R  = {2: (0.1300, 51.990, 0.000764), 3: (0.2170, 15.793, 0.00677),
+           4: (0.3180, 6.520, 0.0303),    5: (0.4410, 3.191, 0.1355)}
+
+def nacaCamber(code, x):
+   '''
+   Mean line yc and slope dyc/dx at x for NACA 4 or 5 digit code (string).
+   '''
+   yc = np.zeros_like(x)
+   dy = np.zeros_like(x)
+   if len(code) == 4 :
+      m, p = int(code[0]) / 100.0, int(code[1]) / 10.0
+      if m > 0.0 :
+         f = x < p
+         yc = np.where(f, m / p**2 * (2*p*x - x**2), 
+                          m / (1-p)**2 * (1 - 2*p + 2*p*x - x**2))
+         dy = np.where(f, 2*m / p**2 * (p - x), 2*m / (1-p)**2 * (p - x))
+   elif len(code) == 5 :
+      cl, P, Q = int(code[0]) * 0.15, int(code[1]), int(code[2])
+      f = cl / 0.3
+      if Q == 0 :
+         m, k1 = NACA5[P]
+         yc = np.where(x < m, k1/6 * (x**3 - 3*m*x**2 + m**2*(3-m)*x), 
+                              k1/6 * m**3 * (1 - x))
+         dy = np.where(x < m, k1/6 * (3*x**2 - 6*m*x + m**2*(3-m)), 
+                              -k1/6 * m**3 + 0*x)
+      else :
+         m, k1, k21 = NACA5R[P]
+         yc = np.where(x < m, 
+                 k1/6 * ((x-m)**3 - k21*(1-m)**3*x - m**3*x + m**3),
+                 k1/6 * (k21*(x-m)**3 - k21*(1-m)**3*x - m**3*x + m**3))
+         dy = np.where(x < m, 
+                 k1/6 * (3*(x-m)**2 - k21*(1-m)**3 - m**3),
+                 k1/6 * (3*k21*(x-m)**2 - k21*(1-m)**3 - m**3))
+      yc, dy = f * yc, f * dy
+   else :
+      raise ValueError("NACA code must have 4 or 5 digits, not " + str(code))
+   return(yc, dy)
+
+
+def nacaProfile(code, n=81, t=None, closedTE=True):
+   '''
+   NACA 4 or 5 digit profile (e.g. "0012", "2412", "23012") as an (n,2)
+   array in the order of profileDAT: trailing edge, upper surface, leading
+   edge, lower surface, trailing edge, with cosine spacing (n odd, rounded 
+   up). t, the thickness / cord, overrides the last two digits. It may be an
+   array of S thicknesses, one per station, giving an (S,n,2) array.
+   closedTE uses the closed trailing edge thickness coefficient, so the 
+   first and last points are both (1, 0).
+   e.g.
+   dat = nacaProfile("0012", 61)
+   dat = nacaProfile("2412", 81, t=np.linspace(0.15, 0.08, 20))
+   '''
+   code = str(code)
+   if t is None : t = int(code[-2:]) / 100.0
+   t = np.asarray(t, dtype=np.float64)
+   m = max(1, int(n) // 2)   # intervals per surface, n = 2m+1
+   x = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, m + 1)))
+   
+   a4 = -0.1036 if closedTE else -0.1015
+   yt = 5.0 * t[..., None] * (0.2969*np.sqrt(x) - 0.1260*x - 0.3516*x**2 
+                              + 0.2843*x**3 + a4*x**4)
+   yc, dy = nacaCamber(code, x)
+   th = np.arctan(dy)
+   s, c = np.sin(th), np.cos(th)
+   upper = np.stack((x - yt*s, yc + yt*c), axis=-1)
+   lower = np.stack((x + yt*s, yc - yt*c), axis=-1)
+   return(np.ascontiguousarray(np.concatenate((upper[..., ::-1, :], 
+                                               lower[..., 1:, :]), axis=-2)))
+
+
+def peakMemory():
+   '''
+   Return (process peak, children peak), the maximum resident set size in
+   kB so far of this process and of its largest terminated child process
+   (e.g. pool workers, once the pool is shut down), from getrusage, which
+   gives kB on Linux but bytes on macOS. (None, None) where unavailable.
+   '''
+   if resource is None : return((None, None))
+   unit = 1024 if sys.platform == "darwin" else 1
+   return(tuple(resource.getrusage(w).ru_maxrss // unit
+                for w in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)))
+
+
+class stageTimer():
+   '''
+   Record wall time, CPU time and memory of named construction stages, and
+   per-station build times. The memory (see peakMemory, in kB, None where
+   unavailable) is the process peak at the end of the stage, "processPeak_kB",
+   how much the stage raised it, "peakIncrease_kB" (0 if an earlier stage
+   peaked higher, it is a high-water mark), and the children peak,
+   "workerPeak_kB", which covers only worker processes that have exited.
+   With verbose=True each stage is also printed.
+   e.g.
+   t = stageTimer()
+   with t.stage("loft"): ...
+   t.toDict(); t.toJSON()
+   '''
+   def __init__(self, verbose=False):
+      self.verbose  = verbose
+      self.stages   = {}
+      self.stations = []
+   
+   def stage(self, name):
+      return(_stageContext(self, name))
+   
+   def record(self, name, wall, cpu, startPeak=None):
+      peak, workers = peakMemory()
+      rise = None if peak is None or startPeak is None else peak - startPeak
+      self.stages[name] = {"wall": wall, "cpu": cpu, "processPeak_kB": peak,
+                           "peakIncrease_kB": rise, "workerPeak_kB": workers}
+      if self.verbose : 
+         print("%-16s wall %8.4fs  cpu %8.4fs  process peak %s kB (+%s)"
+               % (name, wall, cpu, peak, rise))
+   
+   def station(self, wall, cpu):
+      self.stations.append({"wall": wall, "cpu": cpu})
+   
+   def toDict(self):
+      return({"stages": self.stages, "stations": self.stations})
+   
+   def toJSON(self, **kw):
+      return(json.dumps(self.toDict(), **kw))
+
+
+class _stageContext():
+   def __init__(self, timer, name):
+      self.timer = timer
+      self.name  = name
+   
+   def __enter__(self):
+      self.peak = peakMemory()[0]
+      self.wall = time.perf_counter()
+      self.cpu  = time.process_time()
+      return(self)
+   
+   def __exit__(self, *exc):
+      self.timer.record(self.name, time.perf_counter() - self.wall,
+                        time.process_time() - self.cpu, self.peak)
+      return False
+
+
+def edgeRotation(leadingEdge, trailingEdge, curve=None):
+   '''
+   Rotation (degrees) of each station around the cord, from the tangent of
+   the leading edge. leadingEdge and trailingEdge are (N,3) arrays. Tangents
+   are central differences of the points (one-sided at the ends), or, if
+   curve (a Part.BSplineCurve interpolating the leading edge) is given, its
+   tangent at the parameter of each leading edge point on the curve.
+   The tangent and Z axis are projected onto the plane with the cord as 
+   normal, and the rotation is the signed angle between them around the 
+   cord. Stations are rotated by -rotation, so a leading edge leaning 
+   toward +Y (for a cord along +X) gives positive rotation.
+   For a swept leading edge (tangent with a cord component) this no longer
+   adds the sweep angle to the rotation, as the Z.getAngle aproximation did.
+   '''
+   ld = np.asarray(leadingEdge,  dtype=np.float64)
+   if curve is None :
+      t = np.gradient(ld, axis=0)
+   else :
+      t = np.array([tuple(curve.tangent(curve.parameter(FreeCAD.Vector(*p)))[0])
+                    for p in ld])
+   
+   cord = np.asarray(trailingEdge, dtype=np.float64) - ld
+   ln = np.linalg.norm(cord, axis=1)
+   c  = cord / np.where(ln > 0.0, ln, 1.0)[:, None]
+   
+   Z  = np.array([0.0, 0.0, 1.0])
+   tp = t - np.sum(t * c, axis=1)[:, None] * c
+   zp = Z - (c @ Z)[:, None] * c
+   
+   sin = np.sum(np.cross(tp, zp) * c, axis=1)
+   cos = np.sum(tp * zp, axis=1)
+   return(np.degrees(np.arctan2(sin, cos)))
+
+
+def decimateStations(leadingEdge, trailingEdge, rotation, tol, angleTol=0.5,
+                     thickness=None, thickTol=0.005):
+   '''
+   Select the stations needed to loft within tolerance. A station is dropped
+   if linear interpolation (in leading edge arc length) between the kept
+   stations on either side reproduces its leading and trailing edge points
+   within distance tol, its rotation within angleTol degrees and, if
+   thickness (thickness / cord per station) is given, its thickness within
+   thickTol. So chord, sweep, twist and thickness that change almost
+   linearly along the span need only their end stations. Splitting is
+   Douglas-Peucker style, at the station with the largest error. The first
+   and last stations are always kept.
+   Returns (keep, report) where keep is an index array and report a dict
+   with the number removed and the maximum deviations of dropped stations.
+   '''
+   ld  = np.asarray(leadingEdge,  dtype=np.float64)
+   tr  = np.asarray(trailingEdge, dtype=np.float64)
+   rot = np.asarray(rotation,     dtype=np.float64)
+   th  = None if thickness is None else np.asarray(thickness, dtype=np.float64)
+   n = len(ld)
+   span = np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(ld, axis=0), axis=1))))
+   
+   keep = np.zeros(n, dtype=bool)
+   keep[0] = keep[-1] = True
+   maxDev, maxAngle, maxThick = 0.0, 0.0, 0.0
+   stack = [(0, n - 1)]
+   while stack:
+      i, j = stack.pop()
+      if j - i < 2 : continue
+      k  = np.arange(i + 1, j)
+      ds = span[j] - span[i]
+      w  = ((span[k] - span[i]) / ds if ds > 0.0 else (k - i) / (j - i))[:, None]
+      dev = np.maximum(
+               np.linalg.norm(ld[k] - (ld[i] + w * (ld[j] - ld[i])), axis=1),
+               np.linalg.norm(tr[k] - (tr[i] + w * (tr[j] - tr[i])), axis=1))
+      ang = np.abs(rot[k] - (rot[i] + w[:, 0] * (rot[j] - rot[i])))
+      err = np.maximum(dev / tol, ang / angleTol)
+      if th is not None :
+         dth = np.abs(th[k] - (th[i] + w[:, 0] * (th[j] - th[i])))
+         err = np.maximum(err, dth / thickTol)
+      m = int(np.argmax(err))
+      if err[m] > 1.0 :
+         keep[k[m]] = True
+         stack.append((i, k[m]))
+         stack.append((k[m], j))
+      else :
+         maxDev   = max(maxDev,   float(dev.max()))
+         maxAngle = max(maxAngle, float(ang.max()))
+         if th is not None : maxThick = max(maxThick, float(dth.max()))
+   
+   keep = np.flatnonzero(keep)
+   return(keep, {"stations": n, "kept": len(keep), "removed": n - len(keep),
+                 "maxDeviation": maxDev, "maxAngleDeviation": maxAngle,
+                 "maxThicknessDeviation": maxThick})
+
+
+def stationProfile(unitProfile, ld, tr, r):
+   '''
+   Build the profile wire of one station from the unit profile wire:
+   scale to the cord length |tr - ld|, translate to leading edge point ld
+   and rotate by r degrees around the cord. ld and tr are (X, Y, Z).
+   '''
+   ld = FreeCAD.Vector(*ld)
+   tr = FreeCAD.Vector(*tr)
+   #  zero case at tip cause scaling and rotation problems
+   sc = ld.distanceToPoint(tr)
+   if sc < 1e-2 :
+      sc =  1e-2
+      r  = 0.0
+   p  = unitProfile.copy()
+   p.scale(sc)
+   p.translate(ld)
+   #angle adjustment
+   # ld - tr or tr - ld reverse rotationBase.
+   #FreeCADError: Unknown C++ exception
+   if (r != 0.0 ): p.rotate(ld, tr - ld, -r)
+   return(p)
+
+
+def _timedStationProfile(unitProfile, ld, tr, r):
+   wall = time.perf_counter()
+   cpu  = time.process_time()
+   p = stationProfile(unitProfile, ld, tr, r)
+   return(p, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+# Process pool workers for stationProfile. Shapes are passed between
+# processes as BREP strings. The unit profile is sent once per worker.
+
+_unitProfile = None
+
+def _initStationWorker(unitBrep):
+   global _unitProfile
+   if unitBrep is None : return None
+   sh = Part.Shape()
+   sh.importBrepFromString(unitBrep)
+   _unitProfile = sh.Wires[0]
+
+def _stationBrep(ld, tr, r, dat=None):
+   unit = _unitProfile if dat is None else unitWire(dat)
+   p, wall, cpu = _timedStationProfile(unit, ld, tr, r)
+   return(p.exportBrepToString(), wall, cpu)
+
+
+def unitWire(profileDAT):
+   """Wire of the B-spline interpolating an (N,2) unit cord profile."""
+   prof = Part.BSplineCurve()
+   prof.interpolate(toVectors(profileDAT))       
+   return(Part.Wire(prof.toShape()))
+
+
+def stationKeys(leadingEdge, trailingEdge, rotation, profileDAT, stationDAT=None):
+   '''
+   Per station cache keys: the (leading edge, trailing edge, rotation) tuple
+   and a hash of the station's unit profile.
+   '''
+   def digest(a):
+      return(hashlib.sha1(np.ascontiguousarray(a, dtype=np.float64).tobytes()).hexdigest())
+   n = len(rotation)
+   pk = [digest(profileDAT)] * n if stationDAT is None else [digest(d) for d in stationDAT]
+   return([(tuple(a), tuple(b), float(r), k) for a, b, r, k in 
+           zip(np.asarray(leadingEdge, dtype=float).tolist(), 
+               np.asarray(trailingEdge, dtype=float).tolist(), 
+               np.asarray(rotation, dtype=float).tolist(), pk)])
+
+
+def stationProfiles(unitProfile, leadingEdge, trailingEdge, rotation, workers=1,
+                    timer=None, stationDAT=None, cache=None, keys=None):
+   '''
+   Build the list of station profile wires, in order. leadingEdge and 
+   trailingEdge are (N,3) arrays and rotation a list of N angles (degrees).
+   With workers > 1 the stations are built in a pool of that many forked
+   processes (see fork_pool.py, serially where fork is not available) and
+   returned as serialized BREP, then reassembled in station order.
+   If timer (a stageTimer) is given the time of each station is recorded.
+   If stationDAT, an (N,P,2) array of a different unit profile for each
+   station (e.g. varying thickness), is given, unitProfile is not used and
+   each station profile is interpolated separately (in the worker).
+   If cache, a dict, is given only stations whose keys (see stationKeys) 
+   are not in it are built, and the built wires are added to it.
+   '''
+   ld = [tuple(v) for v in np.asarray(leadingEdge,  dtype=float).tolist()]
+   tr = [tuple(v) for v in np.asarray(trailingEdge, dtype=float).tolist()]
+   r  = [float(a) for a in rotation]
+   dat = [None] * len(ld) if stationDAT is None else \
+         [np.asarray(d, dtype=float) for d in stationDAT]
+   
+   idx = list(range(len(ld)))
+   if cache is not None :
+      idx = [i for i in idx if keys[i] not in cache]
+      ld, tr, r, dat = [[a[i] for i in idx] for a in (ld, tr, r, dat)]
+   
+   if not idx :
+      built = []
+   elif workers is None or workers <= 1 or not canFork() :
+      built = [_timedStationProfile(unitProfile if d is None else unitWire(d),
+                                    *a) for a, d in zip(zip(ld, tr, r), dat)]
+   else :
+      chunk = max(1, len(ld) // (4 * workers))
+      unitBrep = None if unitProfile is None else unitProfile.exportBrepToString()
+      with forkPool(workers, _initStationWorker, (unitBrep,)) as pool:
+         built = list(pool.map(_stationBrep, ld, tr, r, dat, chunksize=chunk))
+   
+   profileList = []
+   for i, (p, wall, cpu) in zip(idx, built):
+      if timer is not None : timer.station(wall, cpu)
+      if isinstance(p, str) :
+         sh = Part.Shape()
+         sh.importBrepFromString(p)
+         p = sh.Wires[0]
+      profileList.append(p)
+      if cache is not None : cache[keys[i]] = p
+   if cache is not None : return([cache[k] for k in keys])
+   return(profileList)
+
+
+##########  segmented parallel loft  ##########
+
+def segmentBounds(n, segments):
+   '''
+   Split n stations into segments (first, last) station index ranges,
+   inclusive. Adjacent segments overlap by their shared boundary station.
+   '''
+   segments = max(1, min(int(segments), n - 1))
+   cut = np.linspace(0, n - 1, segments + 1).round().astype(int)
+   return([(int(i), int(j)) for i, j in zip(cut[:-1], cut[1:])])
+
+
+def _loftSegment(wires, maxDegree):
+   return(Part.makeLoft(wires, True, False, False, maxDegree))
+
+
+def _loftSegmentBrep(wireBreps, maxDegree):
+   wires = []
+   for b in wireBreps:
+      sh = Part.Shape()
+      sh.importBrepFromString(b)
+      wires.append(sh.Wires[0])
+   return(_loftSegment(wires, maxDegree).exportBrepToString())
+
+
+def _faceNormal(faces, p):
+   # unit normal at p of the face of faces nearest to p
+   v = Part.Vertex(p)
+   f = min(faces, key=lambda f: f.distToShape(v)[0])
+   n = f.normalAt(*f.Surface.parameter(p))
+   return(np.array((n.x, n.y, n.z)) / n.Length)
+
+
+def _normalAngle(facesA, facesB, p):
+   # angle in degrees between the surfaces facesA and facesB at point p
+   # (on both), regardless of the face orientation
+   c = abs(np.dot(_faceNormal(facesA, p), _faceNormal(facesB, p)))
+   return(float(np.degrees(np.arccos(min(c, 1.0)))))
+
+
+def segmentedLoft(unitProfile, leadingEdge, trailingEdge, rotation, segments,
+                  maxDegree=1, workers=1, stationDAT=None, joinSamples=100,
+                  cache=None, keys=None, stationCache=None, timer=None):
+   '''
+   Loft the stations in segments (see segmentBounds), in a pool of workers
+   forked processes if workers > 1 (segments sent back as BREP, serially
+   where fork is not available, see fork_pool.py), and fuse them into
+   one solid. Adjacent segments are lofted through the same boundary station
+   wire, so the segments meet exactly (position, G0) on that wire, but the
+   side faces of each segment are fitted separately, so the surface may
+   turn a corner there (a G1 break). At each internal boundary, at
+   joinSamples points along the boundary wire (0 to skip), the angle
+   between the side (non planar) face normals of the two adjacent segments
+   is measured, and the largest, in degrees, is reported as "joinAngle".
+   The report also gives "maxJoinAngle", whether the fused solid isValid(),
+   its number of solids and "tolerance", the largest edge or vertex
+   tolerance of the fused solid (sewing gaps show up there).
+   If cache, a dict, is given with the station keys (see stationKeys), 
+   segments whose stations are all unchanged are taken from it and only
+   the others are lofted (and added to it).
+   The station wires of the segments to loft are built first by
+   stationProfiles (with workers, and timer), taking those in stationCache,
+   a dict by station key, from it and adding the others. So only changed
+   stations are rebuilt, and the segment lofts get the wires (as BREP when
+   lofted in workers).
+   Returns (solid, report).
+   '''
+   ld  = np.asarray(leadingEdge,  dtype=np.float64)
+   tr  = np.asarray(trailingEdge, dtype=np.float64)
+   rot = np.asarray(rotation,     dtype=np.float64)
+   bounds = segmentBounds(len(ld), segments)
+   
+   segKeys = [None] * len(bounds)
+   todo = list(range(len(bounds)))
+   if cache is not None :
+      segKeys = [(tuple(keys[i:j+1]), maxDegree) for i, j in bounds]
+      todo = [k for k in todo if segKeys[k] not in cache]
+   
+   # station wires of the segments to loft
+   need = {s for k in todo for s in range(bounds[k][0], bounds[k][1] + 1)}
+   if joinSamples : need |= {j for i, j in bounds[:-1]}    # join boundaries
+   need = sorted(need)
+   wire = {}
+   if need :
+      wire = dict(zip(need, stationProfiles(unitProfile, ld[need], tr[need],
+                  rot[need], workers=workers, timer=timer,
+                  stationDAT=None if stationDAT is None else stationDAT[need],
+                  cache=stationCache,
+                  keys=None if stationCache is None else [keys[s] for s in need])))
+   
+   solids = [None] * len(bounds)
+   if todo and (workers is None or workers <= 1 or not canFork()) :
+      for k in todo:
+         i, j = bounds[k]
+         solids[k] = _loftSegment([wire[s] for s in range(i, j + 1)], maxDegree)
+   elif todo :
+      breps = [[wire[s].exportBrepToString() for s in range(bounds[k][0], bounds[k][1] + 1)]
+               for k in todo]
+      with forkPool(workers) as pool:
+         breps = list(pool.map(_loftSegmentBrep, breps, [maxDegree] * len(todo)))
+      for k, b in zip(todo, breps):
+         sh = Part.Shape()
+         sh.importBrepFromString(b)
+         solids[k] = sh.Solids[0]
+   for k in range(len(bounds)):
+      if cache is None : continue
+      if solids[k] is None : solids[k] = cache[segKeys[k]]
+      else : cache[segKeys[k]] = solids[k]
+   
+   joins = []
+   if joinSamples :
+      for k in range(len(bounds) - 1):
+         pts = wire[bounds[k][1]].discretize(Number=joinSamples)
+         sides = [[f for f in solids[m].Faces if not isinstance(f.Surface, Part.Plane)]
+                  for m in (k, k + 1)]
+         joins.append(max(_normalAngle(sides[0], sides[1], p) for p in pts))
+   
+   foil = solids[0].fuse(solids[1:]).removeSplitter() if len(solids) > 1 else solids[0]
+   if len(foil.Solids) == 1 : foil = foil.Solids[0]
+   tol = [e.Tolerance for e in foil.Edges] + [v.Tolerance for v in foil.Vertexes]
+   return(foil, {"segments": bounds, "joinAngle": joins,
+                 "maxJoinAngle": max(joins) if joins else 0.0,
+                 "valid": foil.isValid(), "solids": len(foil.Solids),
+                 "tolerance": max(tol) if tol else 0.0,
+                 "segmentsLofted": len(todo)})
+
+
+##########  NumPy tessellation (no OCC)  ##########
+
+def stationPoints(profileDAT, leadingEdge, trailingEdge, rotation):
+   '''
+   Return an (S, P, 3) array of the profile points at every station,
+   transformed exactly as stationProfile does with the wires: scaled by the
+   cord length, translated to the leading edge and rotated by -rotation
+   degrees around the cord. A closing point that repeats the first 
+   profile point is dropped (the grid wraps around). profileDAT may be
+   (P,2) or (S,P,2), a profile for each station.
+   '''
+   prof = np.asarray(profileDAT, dtype=np.float64)[..., 0:2]
+   if prof.shape[-2] > 2 and np.allclose(prof[..., 0, :], prof[..., -1, :]) :
+      prof = prof[..., :-1, :]
+   prof = np.concatenate((prof, np.zeros(prof.shape[:-1] + (1,))), axis=-1)
+   if prof.ndim == 2 : prof = prof[None, :, :]
+   
+   ld = np.asarray(leadingEdge,  dtype=np.float64)
+   cord = np.asarray(trailingEdge, dtype=np.float64) - ld
+   sc = np.linalg.norm(cord, axis=1)
+   r  = np.radians(np.asarray(rotation, dtype=np.float64))
+   #  zero case at tip cause scaling and rotation problems
+   tiny = sc < 1e-2
+   r  = np.where(tiny, 0.0, -r)
+   k  = cord / np.where(tiny, 1.0, sc)[:, None]
+   k[tiny] = (1.0, 0.0, 0.0)
+   sc = np.where(tiny, 1e-2, sc)
+   
+   # Rodrigues rotation of the scaled profile around unit cord vector k
+   q   = sc[:, None, None] * prof
+   kk  = k[:, None, :]
+   c   = np.cos(r)[:, None, None]
+   s   = np.sin(r)[:, None, None]
+   dot = np.sum(kk * q, axis=2)[:, :, None]
+   q   = q * c + np.cross(kk, q) * s + kk * dot * (1.0 - c)
+   return(q + ld[:, None, :])
+
+
+def capTriangles(profileDAT):
+   '''
+   Triangulate the closed profile as an (M, 3) array of point indices into
+   the (wrapped) profile used by stationPoints. The upper and lower surfaces,
+   split at the leading edge (minimum X), are zipped together in order of X,
+   so cambered profiles that are not star shaped are handled.
+   '''
+   prof = np.asarray(profileDAT, dtype=np.float64)[:, 0:2]
+   if len(prof) > 2 and np.allclose(prof[0], prof[-1]) : prof = prof[:-1]
+   n = len(prof)
+   x = prof[:, 0]
+   k = int(np.argmin(x))
+   A = list(range(k, -1, -1))   # leading edge to trailing edge, one side
+   B = list(range(k, n))        # leading edge to trailing edge, other side
+   
+   tri = []
+   ia, ib = 0, 0
+   while ia < len(A) - 1 or ib < len(B) - 1:
+      if ib == len(B) - 1 or (ia < len(A) - 1 and x[A[ia+1]] <= x[B[ib+1]]) :
+         tri.append((A[ia], A[ia+1], B[ib]))
+         ia += 1
+      else :
+         tri.append((A[ia], B[ib+1], B[ib]))
+         ib += 1
+   tri = np.array(tri, dtype=np.intp).reshape(-1, 3)
+   keep = (tri[:, 0] != tri[:, 1]) & (tri[:, 1] != tri[:, 2]) & \
+          (tri[:, 0] != tri[:, 2])
+   return(tri[keep])
+
+
+def foilTriangles(pts, cap):
+   '''
+   Generator of (T, 3, 3) triangle chunks for the closed surface on the
+   station grid pts (S, P, 3): the root cap, one band of 2*P triangles 
+   between each pair of adjacent stations, then the tip cap. Memory is 
+   bounded by one band. Triangles are wound consistently; see
+   foilOrientation for the outward orientation.
+   '''
+   P = pts.shape[1]
+   i = np.arange(P)
+   j = (i + 1) % P
+   yield(pts[0][cap])
+   for a, b in zip(pts[:-1], pts[1:]):
+      t1 = np.stack((a[i], a[j], b[j]), axis=1)
+      t2 = np.stack((a[i], b[j], b[i]), axis=1)
+      yield(np.concatenate((t1, t2)))
+   yield(pts[-1][cap[:, ::-1]])
+
+
+def foilOrientation(pts, cap):
+   '''
+   Return 1 if the triangles of foilTriangles(pts, cap) are outward facing
+   and -1 if they must be reversed, from the sign of the volume enclosed
+   by the first station interval (all intervals are wound the same way).
+   '''
+   t = np.concatenate(list(foilTriangles(pts[:2], cap)))
+   return(1 if np.sum(t[:, 0] * np.cross(t[:, 1], t[:, 2])) >= 0.0 else -1)
+
+
+def sectionProperties(profileDAT):
+   '''
+   Area, centroid and second moments of area of closed profile polygons,
+   (P,2) or (S,P,2), by Green's theorem. Returns a dict of arrays, "area"
+   (S,), "centroid" (S,2), and "Ixx", "Iyy", "Ixy" (S,) about the centroid
+   (Ixx is the integral of y^2 dA). Area is positive for CCW profiles.
+   '''
+   prof = np.asarray(profileDAT, dtype=np.float64)[..., 0:2]
+   if prof.ndim == 2 : prof = prof[None, :, :]
+   x,  y  = prof[..., 0], prof[..., 1]
+   x1, y1 = np.roll(x, -1, axis=-1), np.roll(y, -1, axis=-1)
+   c  = x * y1 - x1 * y
+   A  = c.sum(axis=-1) / 2.0
+   cx = ((x + x1) * c).sum(axis=-1) / (6.0 * A)
+   cy = ((y + y1) * c).sum(axis=-1) / (6.0 * A)
+   Ixx = ((y * y + y * y1 + y1 * y1) * c).sum(axis=-1) / 12.0 - A * cy * cy
+   Iyy = ((x * x + x * x1 + x1 * x1) * c).sum(axis=-1) / 12.0 - A * cx * cx
+   Ixy = ((x * y1 + 2.0 * x * y + 2.0 * x1 * y1 + x1 * y) * c).sum(axis=-1) \
+          / 24.0 - A * cx * cy
+   return({"area": A, "centroid": np.stack((cx, cy), axis=-1),
+           "Ixx": Ixx, "Iyy": Iyy, "Ixy": Ixy})
+
+
+def _tetraMoments(t):
+   # volume, first and second moments of the tetrahedra (origin, triangle)
+   a, b, c = t[:, 0], t[:, 1], t[:, 2]
+   v  = np.sum(a * np.cross(b, c), axis=1) / 6.0
+   sm = a + b + c
+   m1 = (v[:, None] * sm).sum(axis=0) / 4.0
+   m2 = sum(np.einsum("n,ni,nj->ij", v, p, p) for p in (a, b, c, sm)) / 20.0
+   return(v.sum(), m1, m2)
+
+
+def massProperties(pts, cap, density=1.0):
+   '''
+   Volume, centroid and inertia tensor of the solid bounded by
+   foilTriangles(pts, cap), without any OCC geometry. The station grid pts
+   (S, P, 3) is integrated along the span one station interval at a time,
+   each closed by its end sections (cap), by signed tetrahedra on the
+   triangles (the divergence theorem). This is exact for the facetted
+   solid: flat between stations, like a maxDegree=1 loft, and with the
+   profile polygon rather than its B-spline interpolation.
+   Returns a dict with "volume", "mass", "centroid" (3,), "inertia" (3,3),
+   the inertia tensor of the mass about the centroid, and "spanVolume"
+   (S-1,), the volume of each station interval.
+   '''
+   pts = np.asarray(pts, dtype=np.float64)
+   ref = pts.reshape(-1, 3).mean(axis=0)   # for round off
+   q   = pts - ref
+   spanVolume = np.zeros(len(q) - 1)
+   m1 = np.zeros(3)
+   m2 = np.zeros((3, 3))
+   for n in range(len(q) - 1):
+      t = np.concatenate(list(foilTriangles(q[n:n+2], cap)))
+      v, a, b = _tetraMoments(t)
+      spanVolume[n] = v
+      m1 += a
+      m2 += b
+   orient = 1.0 if spanVolume.sum() >= 0.0 else -1.0
+   V  = orient * spanVolume.sum()
+   c  = orient * m1 / V
+   C  = density * (orient * m2 - V * np.outer(c, c))
+   return({"volume": V, "mass": density * V, "centroid": ref + c,
+           "inertia": np.trace(C) * np.eye(3) - C,
+           "spanVolume": orient * spanVolume})
+
+
+##########  direct B-spline surface (no loft)  ##########
+
+def bsplineBasis(knots, p, t):
+   '''
+   (len(t), len(knots)-p-1) matrix of the degree p B-spline basis functions
+   for knot vector knots evaluated at parameters t (Cox - de Boor).
+   '''
+   knots = np.asarray(knots, dtype=np.float64)
+   t = np.asarray(t, dtype=np.float64)
+   nk = len(knots)
+   N = ((knots[:-1] <= t[:, None]) & (t[:, None] < knots[1:])).astype(np.float64)
+   # the last parameter belongs to the last non-empty span
+   last = np.flatnonzero(knots[:-1] < knots[1:])[-1]
+   N[t >= knots[-1], :] = 0.0
+   N[t >= knots[-1], last] = 1.0
+   for d in range(1, p + 1):
+      a = knots[d:nk-1] - knots[:nk-1-d]
+      b = knots[d+1:nk] - knots[1:nk-d]
+      left  = (t[:, None] - knots[:nk-1-d]) / np.where(a > 0.0, a, 1.0) * (a > 0.0)
+      right = (knots[d+1:nk] - t[:, None]) / np.where(b > 0.0, b, 1.0) * (b > 0.0)
+      N = left * N[:, :-1] + right * N[:, 1:]
+   return(N)
+
+
+def _interpolationKnots(u, p):
+   '''Parameters u (chord length, 0 to 1) and knots averaging them.'''
+   n = len(u) - 1
+   inner = [np.mean(u[j:j+p]) for j in range(1, n - p + 1)]
+   return(np.concatenate((np.zeros(p + 1), inner, np.ones(p + 1))))
+
+
+def _chordParameters(pts, axis):
+   '''Chord length parameters along axis of grid pts, averaged over the other.'''
+   d = np.linalg.norm(np.diff(pts, axis=axis), axis=-1)
+   d = d.mean(axis=1 - axis)
+   u = np.concatenate(([0.0], np.cumsum(d)))
+   return(u / u[-1])
+
+
+def bsplineSurfaceGrid(pts, uDegree=3, vDegree=1):
+   '''
+   Globally interpolate an (S, P, 3) grid of points (stations x profile
+   points) with one B-spline surface: degree uDegree along the profile and
+   vDegree along the span (each reduced if there are too few points).
+   Returns (poles (P, S, 3), uknots, umults, vknots, vmults, uDegree, vDegree)
+   in the form of Part.BSplineSurface.buildFromPolesMultsKnots.
+   '''
+   pts = np.asarray(pts, dtype=np.float64)
+   S, P = pts.shape[0], pts.shape[1]
+   uDegree = min(uDegree, P - 1)
+   vDegree = min(vDegree, S - 1)
+   u = _chordParameters(pts, 1)
+   v = _chordParameters(pts, 0)
+   uk = _interpolationKnots(u, uDegree)
+   vk = _interpolationKnots(v, vDegree)
+   Nu = bsplineBasis(uk, uDegree, u)
+   Nv = bsplineBasis(vk, vDegree, v)
+   # solve along the profile for every station, then along the span
+   R = np.linalg.solve(Nu, pts.transpose(1, 0, 2).reshape(P, -1)).reshape(P, S, 3)
+   poles = np.linalg.solve(Nv, R.transpose(1, 0, 2).reshape(S, -1)).reshape(S, P, 3)
+   uknots, umults = np.unique(uk, return_counts=True)
+   vknots, vmults = np.unique(vk, return_counts=True)
+   return(poles.transpose(1, 0, 2), uknots, umults, vknots, vmults, 
+          uDegree, vDegree)
+
+
+def bsplineSurfaceSolid(pts, uDegree=3, vDegree=1):
+   '''
+   Solid bounded by the B-spline surface interpolating the closed station
+   grid pts (S, P, 3), first and last profile points equal, see 
+   bsplineSurfaceGrid, and planar faces on its root and tip curves.
+   '''
+   poles, uk, um, vk, vm, ud, vd = bsplineSurfaceGrid(pts, uDegree, vDegree)
+   surf = Part.BSplineSurface()
+   surf.buildFromPolesMultsKnots(
+      [[FreeCAD.Vector(*p) for p in row] for row in poles.tolist()],
+      [int(m) for m in um], [int(m) for m in vm], uk.tolist(), vk.tolist(),
+      False, False, ud, vd)
+   side = surf.toShape()
+   v0, v1 = surf.bounds()[2:4]
+   root = Part.Face(Part.Wire(surf.vIso(v0).toShape()))
+   tip  = Part.Face(Part.Wire(surf.vIso(v1).toShape()))
+   shell = Part.Shell([root, side, tip])
+   shell.sewShape()
+   return(Part.Solid(Part.Shell(shell.Faces)))
+
+
+##########  on-disk cache of built foil solids  ##########
+
+# Bump when a change to the construction changes the solid for the same
+# inputs, so cached solids from older code are not reused.
+CACHE_VERSION = "2"
+
+def foilKey(profileDAT, leadingEdge, trailingEdge, maxDegree, rotation=(),
+            engine="loft"):
+   '''
+   Content hash of the parsed inputs that determine the lofted foil solid:
+   the profile and the leading edge, trailing edge (and rotation, if given)
+   of the stations that are lofted, the engine and its degree(s).
+   '''
+   h = hashlib.sha256()
+   h.update(("surf_foil " + CACHE_VERSION + " " + engine + " " + 
+             str(maxDegree)).encode())
+   for a in (profileDAT, leadingEdge, trailingEdge, rotation):
+      a = np.ascontiguousarray(a, dtype=np.float64)
+      h.update(str(a.shape).encode())
+      h.update(a.tobytes())
+   return(h.hexdigest())
+
+
+class brepCache():
+   '''
+   Directory of BREP files named by content key, with least recently used
+   eviction when the total size exceeds maxBytes. Hits refresh the file
+   modification time, which is the LRU order. Processes may share the
+   directory (e.g. foil_batch workers): a file another one evicts while it
+   is being read is a miss, and is skipped when evicting.
+   e.g.
+   c = brepCache("~/.cache/surf_foil", maxBytes=500e6)
+   z = foil(file_profile="H105Coord.dat", file_LeadTrail="test.sweepPath",
+            cache=c)
+   '''
+   def __init__(self, directory, maxBytes=1e9):
+      self.directory = os.path.expanduser(directory)
+      self.maxBytes  = maxBytes
+      os.makedirs(self.directory, exist_ok=True)
+   
+   def path(self, key):
+      return(os.path.join(self.directory, key + ".brep"))
+   
+   def get(self, key):
+      """Return the cached shape for key, or None."""
+      fn = self.path(key)
+      try :
+         with open(fn) as f: brep = f.read()
+         os.utime(fn)
+      except FileNotFoundError :
+         return None
+      sh = Part.Shape()
+      sh.importBrepFromString(brep)
+      return(sh.Solids[0] if len(sh.Solids) == 1 else sh)
+   
+   def put(self, key, shape):
+      """Store shape under key, then evict down to maxBytes."""
+      fn  = self.path(key)
+      tmp = fn + ".%d.tmp" % os.getpid()
+      shape.exportBrep(tmp)
+      os.replace(tmp, fn)
+      self.evict()
+   
+   def evict(self):
+      files = []
+      for f in os.listdir(self.directory):
+         if f.endswith(".brep") :
+            try :
+               st = os.stat(os.path.join(self.directory, f))
+            except FileNotFoundError :
+               continue
+            files.append((st.st_mtime, st.st_size, f))
+      total = sum(f[1] for f in files)
+      for mtime, size, f in sorted(files):
+         if total <= self.maxBytes : break
+         try :
+            os.remove(os.path.join(self.directory, f))
+         except FileNotFoundError :
+            pass
+         total -= size
+
 
 class foil():
     
     class profile():
-       def __init__(self, profileDAT, doc = None, source = None):
-          self.profileDAT = profileDAT 
-          self.doc        = doc
+       """
+       profileDAT is an (N,2) array of X, Y profile points (float32 when
+       memory-mapped from an airfoil archive). The doc header is stored as
+       one string per line and given back as lists of tokens. Slots and a
+       tuple state keep instances small and cheap to pickle.
+       """
+       __slots__ = ("profileDAT", "docLines", "source", "error")
+
+       def __init__(self, profileDAT, doc = None, source = None, error = None):
+          self.profileDAT = _floatArray(profileDAT)
+          self.docLines   = _docLines(doc)
           self.source     = source
-    
+          self.error      = error
+
+       @property
+       def doc(self) :
+          return(_docTokens(self.docLines))
+
+       def vectors(self, sc=1.0) :
+          """profileDAT as FreeCAD.Vector (Z = 0) made on demand, see vectorView."""
+          return(vectorView(self.profileDAT, sc))
+
+       def __getstate__(self) :
+          return((self.profileDAT, self.docLines, self.source, self.error))
+
+       def __setstate__(self, state) :
+          self.profileDAT, self.docLines, self.source, self.error = state
+
+       def resample(self, n=None, tol=1e-4):
+          """
+          Return a new profile with cosine spaced points, see resampleProfile.
+          The cord normalized error is kept as its error attribute.
+          """
+          dat, err = resampleProfile(self.profileDAT, n, tol)
+          return(self.__class__(dat, doc=self.docLines, source=self.source,
+                                error=err))
+
     class LeadTrail():
-       def __init__(self, leadingEdge, trailingEdge, doc = None, source = None):
-          self.leadingEdge  = leadingEdge
-          self.trailingEdge = trailingEdge
-          self.doc          = doc
+       """
+       leadingEdge and trailingEdge are (N,3) arrays of X, Y, Z points.
+       thickness is None or an (N,) array of thickness / cord per station.
+       doc is stored as for profile.
+       """
+       __slots__ = ("leadingEdge", "trailingEdge", "docLines", "source",
+                    "thickness")
+
+       def __init__(self, leadingEdge, trailingEdge, doc = None, source = None,
+                    thickness = None):
+          self.leadingEdge  = _floatArray(leadingEdge)
+          self.trailingEdge = _floatArray(trailingEdge)
+          self.docLines     = _docLines(doc)
           self.source       = source
-    
+          self.thickness    = _floatArray(thickness)
+
+       @property
+       def doc(self) :
+          return(_docTokens(self.docLines))
+
+       def vectors(self, sc=1.0) :
+          """(leadingEdge, trailingEdge) as FreeCAD.Vector views, see vectorView."""
+          return(vectorView(self.leadingEdge, sc), vectorView(self.trailingEdge, sc))
+
+       def __getstate__(self) :
+          return((self.leadingEdge, self.trailingEdge, self.docLines,
+                  self.source, self.thickness))
+
+       def __setstate__(self, state) :
+          (self.leadingEdge, self.trailingEdge, self.docLines,
+           self.source, self.thickness) = state
+
     class construction():
-       def __init__(self, profileList, rotation, leadingEdgeBspline, tailingEdgeBspline):
-          self.profileList        = profileList
-          self.rotation           = rotation
-          self.leadingEdgeBspline = leadingEdgeBspline
-          self.tailingEdgeBspline = tailingEdgeBspline
-   
+       """
+       View of the construction products of a foil. Each is built on first
+       access (see foil.rotation() etc.) and kept by the foil.
+       """
+       __slots__ = ("_foil",)
+
+       def __init__(self, foil):
+          self._foil = foil
+
+       @property
+       def profileList(self) :
+          return(self._foil.profileList())
+
+       @property
+       def rotation(self) :
+          return(self._foil.rotation())
+
+       @property
+       def leadingEdgeBspline(self) :
+          return(self._foil.leadingEdgeBspline())
+
+       @property
+       def trailingEdgeBspline(self) :
+          return(self._foil.trailingEdgeBspline())
+
     def __init__(self, file_profile = None, file_LeadTrail = None,
-                  profile = None, LeadTrail = None, foil = None, maxDegree=1):
+                  profile = None, LeadTrail = None, foil = None, maxDegree=1,
+                  workers=1, engine="loft", cache=None, verbose=False,
+                  decimate=None, decimateAngle=0.5, decimateThickness=0.005,
+                  profilePoints=None, profileTol=1e-4, profileName=None,
+                  naca=None, nacaPoints=81, surfaceDegree=(3, 1), segments=None,
+                  previous=None):
         """
         Define a foil object with source file and construction information.
         The init method can specify source files file_profile, file_LeadTrail
-        in which case they are loaded then constuction and foil are calculated.
-        Otherwise ...
+        in which case they are loaded. Otherwise ...
+        Nothing else is calculated here. Rotation, decimation, station
+        profiles, edge B-splines and the foil solid are each built on first
+        access (rotation(), profileList(), leadingEdgeBspline(), foil, ...)
+        and kept, so e.g. asking for rotation never triggers the loft.
+        workers > 1 builds the station profiles in a pool of that many processes.
+        engine="mesh" skips the OCC construction and loft entirely. The foil
+        is then None and only available as a triangle mesh, see writeSTL().
+        cache, a brepCache or a directory name, reuses a previously built foil
+        solid with identical inputs, skipping interpolation and loft.
+        The wall and CPU time and memory (see stageTimer) of each construction
+        stage are recorded, see timings(). verbose=True prints them as they
+        complete.
+        decimate, a distance tolerance, drops stations where chord, sweep and
+        twist change almost linearly (see decimateStations) before the loft
+        or mesh. A thickness column is kept within decimateThickness (t/c).
+        The result is reported in self.decimation.
+        profilePoints and/or profileTol resample the profile to fewer cosine
+        spaced points (see resampleProfile) when profilePoints is given.
+        With profileName, file_profile is an airfoil archive (see
+        airfoil_archive.py) and the named profile is opened memory-mapped.
+        naca, a NACA 4 or 5 digit code, generates the profile with nacaPoints
+        points (see nacaProfile) instead of reading a file. If the LeadTrail
+        has a thickness column, each station then gets its own thickness,
+        and its own interpolated profile, resampled like the profile when
+        profilePoints is given.
+        engine="surface" fits one B-spline surface to the station x profile
+        point grid (degrees surfaceDegree, along the profile and the span)
+        and closes the ends with planar faces, instead of building profile
+        wires and lofting.
+        segments > 1 lofts that many overlapping runs of stations separately
+        (in parallel with workers > 1) and fuses them, see segmentedLoft. The
+        join angle (G1 break) and validity are reported in self.segmentation.
+        previous, an earlier loft engine foil (e.g. before editing one line of
+        the sweep path), is an incremental rebuild: station wires, edge
+        B-splines and loft segments whose inputs are unchanged are reused
+        from it, see self.reuse. Rotation uses neighbouring stations, so
+        an edited station also changes its neighbours. Without segments the
+        foil is one loft, so although only changed station wires are rebuilt
+        the whole loft is rebuilt if any station changed. With segments only
+        the segments containing changed stations are re-lofted.
         """
         #   if not (-90 <= lat <= 90):
         #      raise ValueError("must have  -90 <=  latitude <= 90")
-        
-        if file_profile is not None:
-            self.loadProfileDAT(file_profile)
+
+        self.timing = stageTimer(verbose)
+
+        if naca is not None:
+            self.profile = self.profile(nacaProfile(naca, nacaPoints),
+                              doc=[["NACA", str(naca)]], source="NACA " + str(naca))
+        elif file_profile is not None and profileName is not None:
+            with self.timing.stage("load profile"):
+               self.loadProfileArchive(file_profile, profileName)
+        elif file_profile is not None:
+            with self.timing.stage("load profile"):
+               self.loadProfileDAT(file_profile)
         else:
             self.profile  =  profile #CLASS IS NOT EXTERNAL
             #self.profile(profileDAT, doc = profile_doc, source = file_profile)
-        
+
         if file_LeadTrail is not None:
-            self.loadLeadTrail(file_LeadTrail)
+            with self.timing.stage("load LeadTrail"):
+               self.loadLeadTrail(file_LeadTrail)
         else:
-            self.profile  =  profile #CLASS IS NOT EXTERNAL
+            self.LeadTrail = LeadTrail
             #self.LeadTrail= self.LeadTrail(leadingEdge, trailingEdge,
             #                doc = LeadTrail_doc, source = file_LeadTrail)
-        
+
+        if profilePoints is not None :
+           with self.timing.stage("resample profile"):
+              self.profile = self.profile.resample(profilePoints, profileTol)
+
+        if cache is not None and not isinstance(cache, brepCache) :
+           cache = brepCache(cache)
+        self.options = {"maxDegree": maxDegree, "workers": workers,
+                        "engine": engine, "cache": cache, "verbose": verbose,
+                        "decimate": decimate, "decimateAngle": decimateAngle,
+                        "decimateThickness": decimateThickness,
+                        "naca": naca, "nacaPoints": nacaPoints,
+                        "profilePoints": profilePoints,
+                        "surfaceDegree": surfaceDegree, "segments": segments}
+
+        # products built so far, by name, see _product
+        self.products     = {}
+        self.segmentation = None
+        self.reuse        = {}
+
+        # wires, edge splines and solids by their inputs, for incremental rebuilds
+        self.buildCache = {"stations": {}, "segments": {}, "edges": {}}
+        if previous is not None and getattr(previous, "buildCache", None) :
+           for k in self.buildCache: self.buildCache[k].update(previous.buildCache[k])
+
+        self.construction = self.construction(self)
+
         # Tried to use Part.BSplineCurve on the LeadingEdge and then makePipeShell
         #   self.foil = Part.Wire(
         #     self.construction.leadingEdgeBspline).makePipeShell(
         #       self.construction.profileList, True, False) #makeSolid, isFrenet)
         # but it gives twists and ripples in the trailing edge.
         # Just lofting the profiles seems to work better.
- 
+
         #print("making traj wire.")
         #traj = Part.BSplineCurve()
-        #traj.interpolate(self.LeadTrail.leadingEdge)       
+        #traj.interpolate(self.LeadTrail.leadingEdge)
         #leadingEdgeBspline = Part.Wire(traj.toShape())
-        
-        def scaledBspline(dat, sc):
-           z = [FreeCAD.Vector(v[0]*sc, v[1]*sc, v[2]*sc) for v in dat]
-           prof=Part.BSplineCurve()
-           prof.interpolate(z)       
-           prof=Part.Wire(prof.toShape())
-           return prof
-        
-        print("calculating aprox. tangent (rotation) of the leading edge.")
-        #angle adjustment Position is at leadingEndge rotate around cord.
-        # The angle from X-Y plane determined by angle between tangent to 
-        # leadingEdgeBspline and Z axis
-        # this should really be the projection of the tangent onto the
-        # plane defined by the cord being its normal. but for foils with the
-        # cord aproximately in the direction of the X axis this will be aprox Dy/Dz.
-        # Ends are one-sided tangent aprox, interior points use two adjacent
-        Z = FreeCAD.Vector(0, 0, 1)
-        e = self.LeadTrail.leadingEdge
-        ln = len(e)
-        rotation = [ Z.getAngle(e[1] - e[0])*180/math.pi ]
-        for i  in range(ln - 2):
-           rotation.append(Z.getAngle(e[i+2] - e[i])*180/math.pi)
-        rotation.append(Z.getAngle(e[ln-1] - e[ln-2])*180/math.pi)
-        
-        print("building profileList.")
-        profileList = []
-        for ld, tr, r  in zip(self.LeadTrail.leadingEdge, 
-                   self.LeadTrail.trailingEdge, rotation):
-           #  zero case at tip cause scaling and rotation problems
-           sc = ld.distanceToPoint(tr)
-           if sc < 1e-2 :
-              sc =  1e-2
-              r  = 0.0
-           p  = scaledBspline(self.profile.profileDAT, sc)
-           print("scaled profile " + str(sc))
-           p.translate(FreeCAD.Vector(ld))
-           #angle adjustment
-           # ld - tr or tr - ld reverse rotationBase.
-           #FreeCADError: Unknown C++ exception
-           print("ld, tr - ld, -r " + str(ld) + "," + str(tr - ld) + "," + str(-r))
-           if (r != 0.0 ): p.rotate(ld, tr - ld, -r)
-           profileList.append(p)
-           print("rotated profile " + str(sc))
-                
-        print("making EdgeBsplines.")
-        tj = Part.BSplineCurve()
-        tj.interpolate(self.LeadTrail.leadingEdge)       
-        leadingEdgeBspline = Part.Wire(tj.toShape())
-        
-        tj = Part.BSplineCurve()
-        tj.interpolate(self.LeadTrail.trailingEdge)       
-        trailingEdgeBspline = Part.Wire(tj.toShape())
-        
-        self.construction = self.construction(profileList, rotation,
-                             leadingEdgeBspline, trailingEdgeBspline)
-        
-        print("making foil.")
-        #           Part.makeLoft(profileList, solid, ruled, closed, maxDegree)
-        # The default maxDegree 5, and even 3, puts extra wabbles in straight edges,
-        # unless there are many profiles. 1 seems enough for simple foil shapes.
-        # It could be increased or made a parameter for more twisted shapes.
-        
-        self.foil = Part.makeLoft(profileList, True,  False, False, maxDegree) 
-    
+
+    def _product(self, name, build) :
+        """Return product name, calling build() for it only the first time."""
+        if name not in self.products : self.products[name] = build()
+        return(self.products[name])
+
+    def _buildRotation(self) :
+        with self.timing.stage("rotation"):
+           return(edgeRotation(self.LeadTrail.leadingEdge,
+                               self.LeadTrail.trailingEdge))
+
+    def _buildStations(self) :
+        """Stations used for the loft / mesh, after decimation."""
+        o = self.options
+        rotation = self.rotation()
+        keep, decimation = np.arange(len(rotation)), None
+        if o["decimate"] is not None :
+           with self.timing.stage("decimate"):
+              keep, decimation = decimateStations(
+                 self.LeadTrail.leadingEdge, self.LeadTrail.trailingEdge,
+                 rotation, o["decimate"], o["decimateAngle"],
+                 self.LeadTrail.thickness, o["decimateThickness"])
+           if o["verbose"] : print("decimation " + str(decimation))
+
+        # per station profiles for thickness varying along the span
+        stationDAT = None
+        if o["naca"] is not None and self.LeadTrail.thickness is not None :
+           stationDAT = self._nacaStations(self.LeadTrail.thickness[keep])
+        return({"keep": keep, "decimation": decimation,
+                "ld":  self.LeadTrail.leadingEdge[keep],
+                "tr":  self.LeadTrail.trailingEdge[keep],
+                "rot": rotation[keep], "stationDAT": stationDAT,
+                "dat": self.profile.profileDAT if stationDAT is None else stationDAT})
+
+    def _stations(self) :
+        return(self._product("stations", self._buildStations))
+
+    def _nacaStations(self, t) :
+        """
+        (S,P,2) NACA profiles for thicknesses t with the P points of
+        self.profile, so a resampled profile resamples every station too.
+        """
+        o   = self.options
+        dat = nacaProfile(o["naca"], o["nacaPoints"], t=t)
+        if o["profilePoints"] is not None :
+           m   = (len(self.profile.profileDAT) - 1) // 2
+           dat = np.stack([_cosineResample(p, m) for p in dat])
+        return(dat)
+
+    def _capTriangles(self) :
+        # cap of the station grid, from a profile with the grid's point count
+        dat = self._stations()["dat"]
+        return(capTriangles(dat if dat.ndim == 2 else dat[0]))
+
+    @property
+    def keep(self) :
+        """Indices of the stations used for the loft / mesh."""
+        return(self._stations()["keep"])
+
+    @property
+    def decimation(self) :
+        """decimateStations report, None without decimate."""
+        return(self._stations()["decimation"])
+
+    @property
+    def stationDAT(self) :
+        """(S,N,2) per station profiles, None when every station is the same."""
+        return(self._stations()["stationDAT"])
+
+    def _buildKeys(self) :
+        s = self._stations()
+        keys = stationKeys(s["ld"], s["tr"], s["rot"], self.profile.profileDAT,
+                           s["stationDAT"])
+        self.reuse["stations"] = len(keys)
+        self.reuse["stationsReused"] = sum(k in self.buildCache["stations"]
+                                           for k in keys)
+        return(keys)
+
+    def _keys(self) :
+        return(self._product("keys", self._buildKeys))
+
+    def _buildUnitProfile(self) :
+        # Every station is a scaled, translated and rotated copy of the same
+        # profile. Interpolation is affine invariant, so the unit profile is
+        # interpolated once and copies of the wire are transformed, rather
+        # than interpolating scaled points at every station.
+        # (Not possible when the profile varies by station.)
+        if self.stationDAT is not None : return(None)
+        with self.timing.stage("unit profile"):
+           return(unitWire(self.profile.profileDAT))
+
+    def _unitProfile(self) :
+        return(self._product("unitProfile", self._buildUnitProfile))
+
+    def _buildProfileList(self) :
+        s, keys = self._stations(), self._keys()
+        unitProfile = self._unitProfile() if \
+                      self.reuse["stationsReused"] < len(keys) else None
+        with self.timing.stage("stations"):
+           return(stationProfiles(unitProfile, s["ld"], s["tr"], s["rot"],
+                     workers=self.options["workers"], timer=self.timing,
+                     stationDAT=s["stationDAT"],
+                     cache=self.buildCache["stations"], keys=keys))
+
+    def _edgeKeys(self) :
+        return([np.ascontiguousarray(e, dtype=np.float64).tobytes() for e in
+                (self.LeadTrail.leadingEdge, self.LeadTrail.trailingEdge)])
+
+    def _buildEdgeSplines(self) :
+        with self.timing.stage("edge splines"):
+           edges = self.buildCache["edges"]
+           spl = []
+           self.reuse["edgesReused"] = 0
+           for e, k in zip((self.LeadTrail.leadingEdge,
+                            self.LeadTrail.trailingEdge), self._edgeKeys()):
+              if k in edges :
+                 self.reuse["edgesReused"] += 1
+              else :
+                 tj = Part.BSplineCurve()
+                 tj.interpolate(toVectors(e))
+                 edges[k] = Part.Wire(tj.toShape())
+              spl.append(edges[k])
+        return(tuple(spl))
+
+    def _buildFoil(self) :
+        o = self.options
+        engine, cache, segments = o["engine"], o["cache"], o["segments"]
+        if engine == "mesh" :
+           # no OCC geometry, see writeSTL()
+           return(None)
+
+        s = self._stations()
+        if cache is not None :
+           with self.timing.stage("cache lookup"):
+              key = foilKey(s["dat"], s["ld"], s["tr"],
+                            o["surfaceDegree"] if engine == "surface"
+                                               else o["maxDegree"],
+                            s["rot"], engine if not segments or segments < 2
+                                      else engine + " segments " + str(segments))
+              solid = cache.get(key)
+           if solid is not None : return(solid)
+
+        if engine == "surface" :
+           with self.timing.stage("surface"):
+              pts = stationPoints(s["dat"], s["ld"], s["tr"], s["rot"])
+              pts = np.concatenate((pts, pts[:, :1, :]), axis=1)   # closed
+              solid = bsplineSurfaceSolid(pts, *o["surfaceDegree"])
+
+        elif segments is not None and segments > 1 :
+           keys = self._keys()
+           with self.timing.stage("segment lofts"):
+              unitProfile = self._unitProfile() if \
+                            self.reuse["stationsReused"] < len(keys) else None
+              solid, self.segmentation = segmentedLoft(unitProfile,
+                    s["ld"], s["tr"], s["rot"], segments, o["maxDegree"],
+                    o["workers"], s["stationDAT"],
+                    cache=self.buildCache["segments"], keys=keys,
+                    stationCache=self.buildCache["stations"], timer=self.timing)
+           self.reuse["segments"] = len(self.segmentation["segments"])
+           self.reuse["segmentsReused"] = self.reuse["segments"] - \
+                                          self.segmentation["segmentsLofted"]
+           if o["verbose"] : print("segmentation " + str(self.segmentation))
+           self._pruneBuildCache([(tuple(keys[i:j+1]), o["maxDegree"])
+                                  for i, j in self.segmentation["segments"]])
+
+        else :
+           #           Part.makeLoft(profileList, solid, ruled, closed, maxDegree)
+           # The default maxDegree 5, and even 3, puts extra wabbles in straight
+           # edges, unless there are many profiles. 1 seems enough for simple
+           # foil shapes. It could be increased or made a parameter for more
+           # twisted shapes.
+           profileList = self.profileList()
+           # the whole loft is one segment, reused only if nothing changed
+           k = (tuple(self._keys()), o["maxDegree"])
+           self.reuse["loftReused"] = k in self.buildCache["segments"]
+           if not self.reuse["loftReused"] :
+              with self.timing.stage("loft"):
+                 self.buildCache["segments"][k] = Part.makeLoft(profileList,
+                                                 True,  False, False, o["maxDegree"])
+           solid = self.buildCache["segments"][k]
+           self._pruneBuildCache([k])
+
+        if cache is not None :
+           with self.timing.stage("cache store"):
+              cache.put(key, solid)
+        return(solid)
+
+    def _pruneBuildCache(self, used) :
+        # keep only what this foil uses, so chains of rebuilds do not grow
+        c, keys = self.buildCache, self._keys()
+        c["stations"] = {k: c["stations"][k] for k in keys if k in c["stations"]}
+        c["segments"] = {k: c["segments"][k] for k in used}
+        c["edges"]    = {k: c["edges"][k] for k in self._edgeKeys() if k in c["edges"]}
+        if self.options["verbose"] : print("reuse " + str(self.reuse))
+
+    @property
     def foil(self) :
-       """Extract the foil FreeCAD object."""
-       return(self.foil)
+        """The foil FreeCAD solid, built on first access (None for engine="mesh")."""
+        return(self._product("foil", self._buildFoil))
 
     def profileDAT(self) :
-       """Extract profileDAT."""
+       """Extract profileDAT, an (N,2) array."""
        return(self.profile.profileDAT)
-    
+
     def profileList(self) :
-       """Extract profileList."""
-       return(self.construction.profileList)
-    
+       """Extract profileList, the station profile wires."""
+       return(self._product("profileList", self._buildProfileList))
+
     def rotation(self) :
-       """Extract rotation."""
-       return(self.construction.rotation)
-    
+       """Extract rotation, in degrees at every station."""
+       return(self._product("rotation", self._buildRotation))
+
     def leadingEdgeBspline(self) :
        """Extract leadingEdgeBspline."""
-       return(self.construction.leadingEdgeBspline)
-    
+       return(self._product("edgeSplines", self._buildEdgeSplines)[0])
+
     def trailingEdgeBspline(self) :
        """Extract trailingEdgeBspline."""
-       return(self.construction.trailingEdgeBspline)
+       return(self._product("edgeSplines", self._buildEdgeSplines)[1])
+
+    def timings(self) :
+       """Dict of construction stage and per-station timings, see stageTimer."""
+       return(self.timing.toDict())
+    
+    def stationPoints(self) :
+       """(S, P, 3) array of profile points at every (kept) station."""
+       s = self._stations()
+       return(stationPoints(s["dat"], s["ld"], s["tr"], s["rot"]))
+
+    def sectionProperties(self) :
+       """
+       Area, centroid and second moments of area of the section at every
+       (kept) station, see sectionProperties. The profile polygon is scaled
+       by the cord, so "Ixx", "Iyy" and "Ixy" are about the section centroid
+       on the profile X, Y axes. "centroid" is the (S,3) point on the foil.
+       """
+       s  = self._stations()
+       sp = sectionProperties(s["dat"])
+       sc = np.maximum(np.linalg.norm(s["tr"] - s["ld"], axis=1), 1e-2)
+       c  = np.broadcast_to(sp["centroid"], (len(sc), 2))
+       return({"area": sp["area"] * sc**2,
+               "centroid": stationPoints(c[:, None, :], s["ld"], s["tr"],
+                                         s["rot"])[:, 0, :],
+               "Ixx": sp["Ixx"] * sc**4, "Iyy": sp["Iyy"] * sc**4,
+               "Ixy": sp["Ixy"] * sc**4})
+
+    def spanPosition(self) :
+       """(N,) arc length along the leading edge at every LeadTrail station."""
+       ld = self.LeadTrail.leadingEdge
+       return(np.concatenate(([0.0],
+                 np.cumsum(np.linalg.norm(np.diff(ld, axis=0), axis=1)))))
+
+    def sectionAt(self, s) :
+       """
+       Section polygon at span position s, the arc length along the leading
+       edge from the root (see spanPosition), without slicing the OCC solid.
+       Leading and trailing edge points (so cord and offset) and rotation
+       are interpolated linearly between LeadTrail stations, and the profile
+       is placed as stationPoints does. With a thickness column a NACA
+       profile is generated at the interpolated thickness.
+       s may be a number, giving a (P,3) array, or an array of N positions,
+       giving (N,P,3). Positions beyond the ends are clipped to them.
+       """
+       u  = self.spanPosition()
+       si = np.clip(np.atleast_1d(np.asarray(s, dtype=np.float64)), u[0], u[-1])
+       lt = self.LeadTrail
+       ld = np.stack([np.interp(si, u, lt.leadingEdge[:, k])  for k in range(3)], axis=1)
+       tr = np.stack([np.interp(si, u, lt.trailingEdge[:, k]) for k in range(3)], axis=1)
+       rot = np.interp(si, u, self.rotation())
+       dat = self.profile.profileDAT
+       if self.options["naca"] is not None and lt.thickness is not None :
+          dat = self._nacaStations(np.interp(si, u, lt.thickness))
+       pts = stationPoints(dat, ld, tr, rot)
+       return(pts[0] if np.ndim(s) == 0 else pts)
+
+    def massProperties(self, density=1.0) :
+       """
+       Volume, mass, centroid and inertia tensor of the foil from the station
+       grid of profile points, without OCC geometry, see massProperties.
+       Works with any engine.
+       """
+       return(massProperties(self.stationPoints(), self._capTriangles(), density))
+
+    def massPropertiesError(self) :
+       """
+       Compare massProperties() with the OCC foil solid (which is built if
+       it was not already). Returns both volumes, the relative volume error,
+       the centroid distance relative to the largest cord, and the largest
+       inertia tensor difference relative to its largest element.
+       """
+       mp  = self.massProperties()
+       occ = self.foil
+       I   = np.array(occ.MatrixOfInertia.A).reshape(4, 4)[:3, :3]
+       c   = np.array(tuple(occ.CenterOfMass))
+       s   = self._stations()
+       cord = np.linalg.norm(s["tr"] - s["ld"], axis=1).max()
+       return({"volume": mp["volume"], "occVolume": occ.Volume,
+               "volumeError": abs(mp["volume"] - occ.Volume) / occ.Volume,
+               "centroidError": np.linalg.norm(mp["centroid"] - c) / cord,
+               "inertiaError": np.abs(mp["inertia"] - I).max() / np.abs(I).max()})
+
+    def writeSTL(self, filename) :
+       """
+       Write the foil surface as a binary STL directly from the station
+       grid of profile points, with root and tip caps. No OCC loft or 
+       meshing is used, so facets are straight between the profile points
+       (the profile is not B-spline interpolated). Works with any engine.
+       The triangles are streamed a band at a time by stl_io.writeSTLChunks.
+       Returns the number of triangles.
+       """
+       from stl_io import writeSTLChunks
+       pts = self.stationPoints()
+       cap = self._capTriangles()
+       chunks = foilTriangles(pts, cap)
+       if foilOrientation(pts, cap) < 0 : chunks = (t[:, ::-1] for t in chunks)
+       return(writeSTLChunks(filename, chunks, header=b"surf_foil.py binary STL"))
     
     def showProfiles(self) :
        """FreeCAD plot of profileList."""
-       for p in self.construction.profileList: Part.show(p)
+       for p in self.profileList(): Part.show(p)
        return None
         
     def showfoil(self) :
@@ -170,94 +1517,87 @@ class foil():
        return None
         
     def loadProfileDAT(self, source):
-        """read profile from a dat file and return it."""
-        doc = []
-        profileDAT =  []
-        Z = 0.0
-        print("loading profile.")
-        with open(source) as f:  
-           for i in f.readlines():
-              ln =  i.split()
-              ln = [b.strip()  for b in  ln]
-              #print(ln)
-              try : 
-                 X = float(ln[0])
-                 Y = float(ln[1])
-                 #print(X, Y)
-                 profileDAT.append(FreeCAD.Vector(X, Y, Z))
-              except :
-                 doc.append(ln)
-        
+        """
+        read profile from a dat file (Selig or Lednicer, white space or comma
+        separated) into a normalized closed (N,2) array, see parseAirfoil.
+        """
+        profileDAT, doc, fmt = parseAirfoil(source)
         self.profile = self.profile(profileDAT, doc=doc, source=source)
 
+    def loadProfileArchive(self, archive, name):
+        """
+        open profile name from an airfoil archive (airfoil_archive.py) as a
+        memory-mapped (N,2) float32 array.
+        """
+        from airfoil_archive import airfoilArchive
+        a = archive if isinstance(archive, airfoilArchive) else airfoilArchive(archive)
+        self.profile = self.profile(a.profileDAT(name), doc=a.doc(name),
+                                    source=str(a.archive) + ":" + name)
+
     def loadLeadTrail(self, source="/home/paul/CAD/foil/test.sweepPath"):
-        """read Lead and Trailing edge data from file and return it."""
-        doc =  []
-        leadingEdge =  []
-        trailingEdge = []
-        print("loading leading and trailing edges.")
-        with open(source) as f:  
-           for i in f.readlines():
-              ln =  i.split()
-              ln = [b.strip()  for b in  ln]
-              #print(ln)
-              try : 
-                 X = float(ln[0])
-                 Y = float(ln[1])
-                 Z = float(ln[2])
-                 leadingEdge.append(FreeCAD.Vector(X, Y, Z))
-                 X = float(ln[3])
-                 Y = float(ln[4])
-                 Z = float(ln[5])
-                 trailingEdge.append(FreeCAD.Vector(X, Y, Z))
-              except :
-                 doc.append(ln)
-             
-        self.LeadTrail = self.LeadTrail(leadingEdge,trailingEdge, doc=doc, source=source)
-
-
-z = foil(file_profile="/home/paul/CAD/foil/H105Coord.dat",
-          file_LeadTrail="/home/paul/CAD/foil/test.sweepPath")
-z.show()
-
-#z.showfoil()  
-#z.showProfiles()
-#z.showBspline()
-
-z2 = foil(file_profile="/home/paul/CAD/foil/H105Coord.dat",
-          file_LeadTrail="/home/paul/CAD/foil/test2.sweepPath")
-z2.show()
-
-z3 = foil(file_profile="/home/paul/CAD/foil/H105Coord.dat",
-          file_LeadTrail="/home/paul/CAD/foil/test3.sweepPath",
-          maxDegree=3)
-z3.show()
-
-
-# intersection of line and a plane
-
-Z  = FreeCAD.Vector( 0, 0, 1)
-
-p1 = FreeCAD.Vector( 100, 0, 1)
-p2 = FreeCAD.Vector(0, 100, 1)
-p3 = FreeCAD.Vector(-100, 0, 1)
-p4 = FreeCAD.Vector(0, -100, 1)
-
-# p is a surface (plane but bounded by points p*) because face=True
-p = Draft.makeWire([p1, p2, p3, p4], closed=True, face = True)
-zzz = Part.makeLine(FreeCAD.Vector(1,0, 0), FreeCAD.Vector(1,0, 10))
-dist,point,geom=zzz.distToShape(p.Shape)
-dist
-point
-geom
-
-# project vector onto spline 
-
-Z  = FreeCAD.Vector( 0, 0, 1)
-sp = z3.leadingEdgeBspline()
-
-zzz = Z.project(sp)
-zzzz = sp.project(Z)
-
-sp = z3.leadingEdgeBspline()
-zd = sp.discretize(20)
+        """
+        read Lead and Trailing edge data from file into (N,3) arrays.
+        An optional 7th column is the thickness / cord of each station.
+        """
+        lt, doc = loadArray(source, 6, maxcol=7)
+        self.LeadTrail = self.LeadTrail(lt[:, 0:3], lt[:, 3:6], 
+                                        doc=doc, source=source,
+                                        thickness=lt[:, 6] if lt.shape[1] > 6 else None)
+
+
+# Interactive examples (FreeCAD GUI). For headless batch builds over 
+# profile x sweep path files see foil_batch.py.
+
+if __name__ == "__main__":
+
+   z = foil(file_profile="/home/paul/CAD/foil/H105Coord.dat",
+             file_LeadTrail="/home/paul/CAD/foil/test.sweepPath")
+   z.show()
+
+   #z.showfoil()  
+   #z.showProfiles()
+   #z.showBspline()
+
+   z2 = foil(file_profile="/home/paul/CAD/foil/H105Coord.dat",
+             file_LeadTrail="/home/paul/CAD/foil/test2.sweepPath")
+   z2.show()
+
+   z3 = foil(file_profile="/home/paul/CAD/foil/H105Coord.dat",
+             file_LeadTrail="/home/paul/CAD/foil/test3.sweepPath",
+             maxDegree=3)
+   z3.show()
+
+   # analytic mass properties (no OCC) against the OCC solid
+   for f in (z, z2, z3): print(f.massPropertiesError())
+
+   # section polygons at 20 span positions, without the OCC solid
+   sections = z3.sectionAt(np.linspace(0.0, z3.spanPosition()[-1], 20))
+
+
+   # intersection of line and a plane
+
+   Z  = FreeCAD.Vector( 0, 0, 1)
+
+   p1 = FreeCAD.Vector( 100, 0, 1)
+   p2 = FreeCAD.Vector(0, 100, 1)
+   p3 = FreeCAD.Vector(-100, 0, 1)
+   p4 = FreeCAD.Vector(0, -100, 1)
+
+   # p is a surface (plane but bounded by points p*) because face=True
+   p = Draft.makeWire([p1, p2, p3, p4], closed=True, face = True)
+   zzz = Part.makeLine(FreeCAD.Vector(1,0, 0), FreeCAD.Vector(1,0, 10))
+   dist,point,geom=zzz.distToShape(p.Shape)
+   dist
+   point
+   geom
+
+   # project vector onto spline 
+
+   Z  = FreeCAD.Vector( 0, 0, 1)
+   sp = z3.leadingEdgeBspline()
+
+   zzz = Z.project(sp)
+   zzzz = sp.project(Z)
+
+   sp = z3.leadingEdgeBspline()
+   zd = sp.discretize(20)
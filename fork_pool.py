@@ -0,0 +1,30 @@
+# Process pools for the scripts in this repo that run in FreeCAD.
+#
+# In FreeCAD (and FreeCADCmd) sys.executable is FreeCAD itself, so workers
+# started with "spawn" (the default on Windows and macOS, and on Linux from
+# Python 3.14) would run FreeCAD and never start. The pools here always
+# fork. e.g.
+#
+#  from fork_pool import canFork, forkPool
+#  if workers > 1 and canFork() :
+#     with forkPool(workers) as pool: out = list(pool.map(f, jobs))
+#  else :
+#     out = [f(j) for j in jobs]
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def canFork():
+   '''True where worker processes can be forked (not on Windows).'''
+   return("fork" in multiprocessing.get_all_start_methods())
+
+
+def forkPool(workers, initializer=None, initargs=()):
+   '''
+   ProcessPoolExecutor of workers forked processes. Check canFork() first
+   and run serially where it is False.
+   '''
+   return(ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                              initargs=initargs,
+                              mp_context=multiprocessing.get_context("fork")))
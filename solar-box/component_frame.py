@@ -2,9 +2,12 @@
 # This is not structural and may not be used, but is size for interior 
 # of a silicon? box which would be closed by solar panel.
 
-import Part, PartDesignGui
-import Mesh, MeshPart, MeshPartGui
+import Part
 import math
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stl_export import exportSTL
 
 
 ########################################################
@@ -284,17 +287,7 @@ FreeCAD.Console.PrintMessage('Design Construction complete.\n')
 #####  Mesh
 #######################################
 
-docName = 'componentFrame'
-doc = FreeCAD.newDocument(docName) 
-App.setActiveDocument(docName)
-
-mesh = doc.addObject("Mesh::Feature","Mesh")
-mesh.Mesh = MeshPart.meshFromShape(Shape=componentFrame, 
-	   LinearDeflection=0.1, AngularDeflection=0.523599, Relative=False)
-
-mesh.Label= "componentFrame  (Meshed)"
-mesh.ViewObject.CreaseAngle=25.0
-Mesh.export([mesh], "./" + "componentFrame.stl")
+exportSTL(componentFrame, "./" + "componentFrame.stl")
 
 
 #######################################
@@ -2,9 +2,12 @@
 #  (solar_lid fits on top to hold panel- compare Length and Width parameters!! )
 # This is superceded by solar_epoxy_box on which solar panel fits directly (no lid).
 
-import Part, PartDesignGui
-import Mesh, MeshPart, MeshPartGui
+import Part
 import math
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stl_export import exportSTL
 
 
 ########################################################
@@ -115,15 +118,5 @@ boxSlice = box.cut(Part.makeBox(
 #####  Mesh
 #######################################
 
-docName = 'box'
-doc = FreeCAD.newDocument(docName) 
-App.setActiveDocument(docName)
-
-mesh = doc.addObject("Mesh::Feature","Mesh")
-mesh.Mesh = MeshPart.meshFromShape(Shape=boxSlice, 
-	   LinearDeflection=0.1, AngularDeflection=0.523599, Relative=False)
-
-mesh.Label= "box  (Meshed)"
-mesh.ViewObject.CreaseAngle=25.0
-Mesh.export([mesh], "./" + "solar_box_plug.stl")
+exportSTL(boxSlice, "./" + "solar_box_plug.stl")
 
@@ -3,9 +3,12 @@
 # Possibly could be used as mold plug, but probably just 3D print and use.
 # (Compare  solar_epoxy_box_plug.py which has sloped top and lower profile.)
 
-import Part, PartDesignGui
-import Mesh, MeshPart, MeshPartGui
+import Part
 import math
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stl_export import exportSTL
 
 
 ########################################################
@@ -398,24 +401,6 @@ boxSlice = box.cut(Part.makeBox(
 
 # export stl for boxSlice and box.
 
-docName = 'box'
-doc = FreeCAD.newDocument(docName) 
-App.setActiveDocument(docName)
-
-
-meshSlice = doc.addObject("Mesh::Feature","Mesh")
-meshSlice.Mesh = MeshPart.meshFromShape(Shape=boxSlice, 
-	   LinearDeflection=0.1, AngularDeflection=0.523599, Relative=False)
-
-meshSlice.Label= "boxSlice  (Meshed)"
-meshSlice.ViewObject.CreaseAngle=25.0
-Mesh.export([meshSlice], "./" + "slice_solar_breadboard_box.stl")
-
-
-meshBox = doc.addObject("Mesh::Feature","MeshBox")
-meshBox.Mesh = MeshPart.meshFromShape(Shape=box, 
-	   LinearDeflection=0.1, AngularDeflection=0.523599, Relative=False)
-meshBox.Label= "box  (Meshed)"
-meshBox.ViewObject.CreaseAngle=25.0
-Mesh.export([meshBox], "./" + "solar_breadboard_box.stl")
+exportSTL(boxSlice, "./" + "slice_solar_breadboard_box.stl")
+exportSTL(box,      "./" + "solar_breadboard_box.stl")
 
@@ -2,9 +2,12 @@
 # (Compare  solar_box_plug.py and solar_lid_plug.py which fit together with
 #  the lid holding the solar panel.
 
-import Part, PartDesignGui
-import Mesh, MeshPart, MeshPartGui
+import Part
 import math
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from stl_export import exportSTL
 
 
 ########################################################
@@ -334,15 +337,5 @@ box = box.fuse([batteryBox])
 #####  Mesh
 #######################################
 
-docName = 'box'
-doc = FreeCAD.newDocument(docName) 
-App.setActiveDocument(docName)
-
-mesh = doc.addObject("Mesh::Feature","Mesh")
-mesh.Mesh = MeshPart.meshFromShape(Shape=boxSlice, 
-	   LinearDeflection=0.1, AngularDeflection=0.523599, Relative=False)
-
-mesh.Label= "box  (Meshed)"
-mesh.ViewObject.CreaseAngle=25.0
-Mesh.export([mesh], "./" + "solar_epoxy_box_plug.stl")
+exportSTL(boxSlice, "./" + "solar_epoxy_box_plug.stl")
 
@@ -0,0 +1,459 @@
+# Headless STL export of FreeCAD shapes, shared by the scripts in this repo.
+#
+# The shape is meshed with MeshPart.meshFromShape and written in one pass,
+# with no document, Mesh::Feature or ViewObject (so no GUI), which works in
+# FreeCADCmd batch jobs. e.g. in a script in a sub directory
+#
+#  import os, sys
+#  sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+#  from stl_export import exportSTL
+#  exportSTL(box, "moldForSilicone.stl")
+#
+# FreeCAD modules are imported when first needed.
+#
+# Instead of fixed deflections, exportSTL can be given a budget, a maximum
+# number of triangles and/or a chord error (the largest distance between
+# mesh and surface), see adaptiveDeflection. e.g.
+#  exportSTL(box, "moldForSilicone.stl", maxTriangles=200000)
+
+#
+# For big parts exportSTL(..., stream=True) meshes and writes one face at a
+# time (see faceTriangles and stl_io.writeSTLChunks), so the whole mesh is
+# never held in memory. The faces may not join watertight, which is checked.
+#
+# exportSTL(..., workers=8) meshes batches of faces in a process pool and
+# welds and stitches the face meshes along their shared edges, see
+# parallelTriangles.
+
+import hashlib, warnings
+import numpy as np
+from fork_pool import canFork, forkPool
+
+# the settings all the scripts used
+LINEAR_DEFLECTION  = 0.1
+ANGULAR_DEFLECTION = 0.523599     # 30 degrees
+RELATIVE           = False
+
+# coarsest angular deflection adaptiveDeflection relaxes to
+MAX_ANGULAR_DEFLECTION = 1.570796  # 90 degrees
+
+
+def meshShape(shape, linearDeflection=LINEAR_DEFLECTION,
+              angularDeflection=ANGULAR_DEFLECTION, relative=RELATIVE):
+   '''Return a Mesh.Mesh of shape, tessellated with MeshPart.meshFromShape.'''
+   import MeshPart
+   return(MeshPart.meshFromShape(Shape=shape, LinearDeflection=linearDeflection,
+                   AngularDeflection=angularDeflection, Relative=relative))
+
+
+def meshVertices(mesh):
+   '''(N,3,3) array of the triangle vertices of a Mesh.Mesh.'''
+   points, facets = mesh.Topology
+   if not facets : return(np.zeros((0, 3, 3)))
+   return(np.array(points, dtype=np.float64)[np.array(facets, dtype=np.intp)])
+
+
+def faceTriangles(shape, linearDeflection=LINEAR_DEFLECTION,
+                  angularDeflection=ANGULAR_DEFLECTION, relative=RELATIVE):
+   '''
+   Generator of (M,3,3) triangle vertex chunks, one per face of shape, each
+   face tessellated with meshShape. Only one face mesh is in memory at a time.
+   '''
+   for face in shape.Faces:
+      yield(meshVertices(meshShape(face, linearDeflection, angularDeflection,
+                                   relative)))
+
+
+# shape being meshed in a parallelTriangles worker process
+_shape = None
+
+def _initFaceWorker(brep):
+   global _shape
+   import Part
+   _shape = Part.Shape()
+   _shape.importBrepFromString(brep)
+
+def _meshFaces(faces, linearDeflection, angularDeflection, relative):
+   return([meshVertices(meshShape(_shape.Faces[i], linearDeflection,
+                                  angularDeflection, relative)) for i in faces])
+
+
+def faceBatches(shape, n):
+   '''
+   Split the face indices of shape into n batches of about equal total
+   area, largest faces first, as a proxy for equal meshing work.
+   '''
+   area    = [f.Area for f in shape.Faces]
+   batches = [[] for i in range(n)]
+   load    = [0.0] * n
+   for i in sorted(range(len(area)), key=lambda i: -area[i]):
+      k = load.index(min(load))
+      batches[k].append(i)
+      load[k] += area[i]
+   return([b for b in batches if b])
+
+
+def _rowGroups(a):
+   # group index of each row of a (equal rows, equal group) and the first
+   # row of each group, by lexicographic sort
+   o = np.lexsort(a.T[::-1])
+   b = a[o]
+   start = np.concatenate(([True], np.any(b[1:] != b[:-1], axis=1)))
+   g = np.empty(len(a), dtype=np.intp)
+   g[o] = np.cumsum(start) - 1
+   return(g, o[start])
+
+
+def _weldPoints(v, tol):
+   # merge the (N,3) points v closer than tol, see weldVertices. Returns
+   # (points (V,3), index (N,) of each point of v in points)
+   inv, first = _rowGroups(v)
+   u = v[first]
+   label = np.arange(len(u))
+   shifts = [np.array((a, b, c)) * 0.5 for a in (0, 1) for b in (0, 1) for c in (0, 1)]
+   changed = True
+   while changed :
+      changed = False
+      for sh in shifts:
+         g = _rowGroups(np.floor(u / (2.0 * tol) + sh).astype(np.int64))[0]
+         low = np.full(g.max() + 1, len(u))
+         np.minimum.at(low, g, label)
+         new = low[g]
+         if np.any(new < label) :
+            label, changed = new, True
+   root, lab = np.unique(label, return_inverse=True)
+   return(u[root], lab.reshape(-1)[inv])
+
+
+def weldVertices(vertices, tol=1e-7):
+   '''
+   Merge the corners of (N,3,3) triangles closer than tol (default OCC's
+   Precision::Confusion), e.g. along the edges shared by separately meshed
+   faces. Points are grouped in cells of size 2*tol on the 8 grids shifted
+   by tol along each axis; two points closer than tol share a cell on at
+   least one of them, however they straddle cell boundaries. Groups are
+   merged transitively. Returns (points (V,3), triangles (M,3) indices into
+   points), with triangles collapsed by the merge removed.
+   '''
+   points, idx = _weldPoints(np.asarray(vertices, dtype=np.float64).reshape(-1, 3), tol)
+   tri = idx.reshape(-1, 3)
+   ok  = (tri[:, 0] != tri[:, 1]) & (tri[:, 1] != tri[:, 2]) & \
+         (tri[:, 0] != tri[:, 2])
+   return(points, tri[ok])
+
+
+def _edgeCounts(t):
+   # group (see _rowGroups) of each of the 3M edges of (M,3) indexed
+   # triangles, edge k of triangle i at k*M+i, and how many share it
+   e = np.sort(np.concatenate((t[:, [0, 1]], t[:, [1, 2]], t[:, [2, 0]])), axis=1)
+   g = _rowGroups(e)[0]
+   return(g, np.bincount(g)[g])
+
+
+def openEdges(triangles):
+   '''
+   Number of edges of (M,3) indexed triangles not shared by exactly two
+   triangles. 0 means the mesh is watertight.
+   '''
+   t = np.asarray(triangles)
+   if not len(t) : return(0)
+   g, n = _edgeCounts(t)
+   return(len(np.unique(g[n != 2])))
+
+
+def boundaryEdges(vertices):
+   '''
+   (E,2,3) end points of the edges of (M,3,3) triangles, e.g. one face
+   mesh, used by only one of them: the boundary of the face mesh. Pass all
+   of them, for every face, to openEdgeCount to check the faces join.
+   '''
+   v = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+   if not len(v) : return(np.zeros((0, 2, 3)))
+   inv, first = _rowGroups(v)
+   t = inv.reshape(-1, 3)
+   e = np.concatenate((t[:, [0, 1]], t[:, [1, 2]], t[:, [2, 0]]))
+   return(v[first][e[_edgeCounts(t)[1] == 1]])
+
+
+def openEdgeCount(edges, tol=1e-7):
+   '''
+   Number of the (E,2,3) edges (from boundaryEdges of each face mesh) not
+   matched by exactly one other, after welding their ends (weldVertices).
+   0 means the face meshes join watertight.
+   '''
+   e = np.asarray(edges, dtype=np.float64).reshape(-1, 3)
+   if not len(e) : return(0)
+   e = np.sort(_weldPoints(e, tol)[1].reshape(-1, 2), axis=1)
+   e = e[e[:, 0] != e[:, 1]]
+   if not len(e) : return(0)
+   g = _rowGroups(e)[0]
+   return(int(np.sum(np.bincount(g) != 2)))
+
+
+def stitchCracks(points, triangles, face, gap, tol=1e-7):
+   '''
+   Close the cracks left where faces meshed separately discretized a
+   shared edge differently. Each open edge (used by one triangle) gets the
+   open edge vertices of the other faces (face, the face index of each
+   triangle) that lie along it, within gap of the segment (the linear
+   deflection: edge points are on the edge curve, segments within the
+   deflection of it), and its triangle is split at them. So both sides
+   end up with the union of their points along the edge, and no point is
+   moved or meshed again. A triangle split on more than one edge is
+   fanned from a new vertex at its centroid.
+   Returns (points, triangles), unchanged if there are no open edges.
+   '''
+   t = np.asarray(triangles)
+   M = len(t)
+   if not M : return(points, t)
+   open_ = np.flatnonzero(_edgeCounts(t)[1] == 1)
+   if not len(open_) : return(points, t)
+   e  = np.concatenate((t[:, [0, 1]], t[:, [1, 2]], t[:, [2, 0]]))[open_]
+   ef = np.asarray(face)[open_ % M]
+   # open edge vertices, once per face they are on
+   vf = np.stack((e.reshape(-1), np.repeat(ef, 2)), axis=1)
+   vf = vf[_rowGroups(vf)[1]]
+   P  = points[vf[:, 0]]
+   a, ab = points[e[:, 0]], points[e[:, 1]] - points[e[:, 0]]
+   L2 = np.maximum(np.sum(ab * ab, axis=1), tol * tol)
+   
+   # nearest open edge of another face along which each vertex lies
+   best = np.full(len(vf), np.inf)
+   edge = np.full(len(vf), -1)
+   pos  = np.zeros(len(vf))
+   cols = np.arange(len(vf))
+   for c in np.array_split(np.arange(len(e)), max(1, len(e) * len(vf) // 2000000)):
+      ap = P[None, :, :] - a[c][:, None, :]
+      sc = np.sum(ap * ab[c][:, None, :], axis=2) / L2[c][:, None]
+      d  = np.linalg.norm(ap - sc[:, :, None] * ab[c][:, None, :], axis=2)
+      ok = (sc * np.sqrt(L2[c])[:, None] > tol) & \
+           ((1.0 - sc) * np.sqrt(L2[c])[:, None] > tol) & (d <= gap) & \
+           (vf[None, :, 1] != ef[c][:, None]) & \
+           (vf[None, :, 0] != e[c, 0][:, None]) & (vf[None, :, 0] != e[c, 1][:, None])
+      d  = np.where(ok, d, np.inf)
+      k  = np.argmin(d, axis=0)
+      dk = d[k, cols]
+      better = dk < best
+      best[better] = dk[better]
+      edge[better] = c[k[better]]
+      pos[better]  = sc[k, cols][better]
+   hit = edge >= 0
+   if not np.any(hit) : return(points, t)
+   
+   # points to insert along each open edge of each triangle, in order
+   ins = {}
+   for j, v, s in sorted(set(zip(edge[hit].tolist(), vf[hit, 0].tolist(),
+                                 pos[hit].tolist())), key=lambda x: (x[0], x[2])):
+      i, k = open_[j] % M, open_[j] // M
+      ins.setdefault(i, {}).setdefault(k, [])
+      if v not in ins[i][k] : ins[i][k].append(v)
+   points = [points]
+   nv  = len(points[0])
+   new = []
+   for i, sides in ins.items():
+      tri = t[i]
+      if len(sides) == 1 :
+         (k, pts), = sides.items()
+         seq = [tri[k]] + pts + [tri[(k + 1) % 3]]
+         new += [(p, q, tri[(k + 2) % 3]) for p, q in zip(seq[:-1], seq[1:])]
+      else :
+         poly = sum([[tri[k]] + sides.get(k, []) for k in range(3)], [])
+         points.append(points[0][tri].mean(axis=0)[None, :])
+         new += [(p, q, nv) for p, q in zip(poly, poly[1:] + poly[:1])]
+         nv += 1
+   keep = np.ones(M, dtype=bool)
+   keep[list(ins)] = False
+   return(np.concatenate(points),
+          np.concatenate((t[keep], np.array(new, dtype=t.dtype).reshape(-1, 3))))
+
+
+def parallelTriangles(shape, workers, linearDeflection=LINEAR_DEFLECTION,
+                      angularDeflection=ANGULAR_DEFLECTION, relative=RELATIVE,
+                      batches=None):
+   '''
+   Tessellate the faces of shape in a pool of workers processes, in batches
+   (default 4 per worker, see faceBatches) with the same deflections as
+   meshShape, and weld the face meshes along shared edges (weldVertices).
+   Returns (points (V,3), triangles (M,3)).
+   Workers are forked (see fork_pool.py). Where fork is not available
+   (Windows) the faces are meshed serially.
+   Faces meshed separately may discretize a shared edge differently (e.g.
+   a curved fillet face and the planar face next to it), so the cracks
+   this leaves are closed by stitchCracks, inserting each side's edge
+   points into the other, with no meshing again.
+   '''
+   if not canFork() :
+      faces = list(faceTriangles(shape, linearDeflection, angularDeflection,
+                                 relative))
+   else :
+      jobs = faceBatches(shape, batches if batches is not None else 4 * workers)
+      with forkPool(workers, _initFaceWorker, (shape.exportBrepToString(),)) as pool:
+         meshed = list(pool.map(_meshFaces, jobs, [linearDeflection] * len(jobs),
+                                [angularDeflection] * len(jobs), [relative] * len(jobs)))
+      faces = [None] * len(shape.Faces)
+      for b, m in zip(jobs, meshed):
+         for i, v in zip(b, m): faces[i] = v
+   v = np.concatenate(faces).reshape(-1, 3)
+   points, idx = _weldPoints(v, 1e-7)
+   tri  = idx.reshape(-1, 3)
+   face = np.repeat(np.arange(len(faces)), [len(f) for f in faces])
+   ok   = (tri[:, 0] != tri[:, 1]) & (tri[:, 1] != tri[:, 2]) & (tri[:, 0] != tri[:, 2])
+   gap  = linearDeflection * (shape.BoundBox.DiagonalLength if relative else 1.0)
+   return(stitchCracks(points, tri[ok], face[ok], gap))
+
+
+# triangle count of every trial mesh, by (shapeHash, linear, angular deflection)
+TRIAL_COUNTS = {}
+
+
+def shapeHash(shape):
+   '''Hex sha256 of the BREP of shape, the same for identical geometry.'''
+   return(hashlib.sha256(shape.exportBrepToString().encode("utf-8")).hexdigest())
+
+
+def trialCount(shape, linearDeflection, angularDeflection=ANGULAR_DEFLECTION,
+               key=None, meshes=None):
+   '''
+   Number of triangles of meshShape(shape, ...) with absolute deflections,
+   meshing only if this shape (key, default shapeHash(shape)) has not been
+   tried with these settings before (see TRIAL_COUNTS). If it is meshed and
+   meshes, a dict, is given the mesh is added to it by (linear, angular)
+   deflection.
+   '''
+   d = (float(linearDeflection), float(angularDeflection))
+   k = (key if key is not None else shapeHash(shape),) + d
+   if k not in TRIAL_COUNTS :
+      m = meshShape(shape, linearDeflection, angularDeflection, False)
+      TRIAL_COUNTS[k] = m.CountFacets
+      if meshes is not None : meshes[d] = m
+   return(TRIAL_COUNTS[k])
+
+
+def adaptiveDeflection(shape, maxTriangles=None, chordError=None,
+                       angularDeflection=ANGULAR_DEFLECTION, step=1.05,
+                       refine=False, keep=None):
+   '''
+   Return the absolute (linear, angular) deflections that meet the budget,
+   searching trial meshes (counts cached, see trialCount).
+   With only chordError it is chordError, the coarsest mesh within it.
+   With maxTriangles it is the coarser of LINEAR_DEFLECTION (the default
+   mesh, if it fits) and the finest linear deflection, to within a factor
+   step, with at most maxTriangles triangles, found by stepping by factors
+   of 4 from LINEAR_DEFLECTION to bracket it, then bisecting. refine=True
+   keeps stepping finer than LINEAR_DEFLECTION to use up the budget (down
+   to 1e-5 of the bounding box diagonal).
+   With both it is chordError, coarsened if needed to keep within
+   maxTriangles.
+   angularDeflection also bounds the triangle count, so if even a linear
+   deflection of the bounding box diagonal gives more than maxTriangles,
+   the angular deflection is doubled (up to MAX_ANGULAR_DEFLECTION) and the
+   linear deflection searched again. If no setting meets maxTriangles
+   ValueError is raised.
+   If keep, a dict, is given it is left holding the trial mesh at the
+   returned deflections, by deflections, if that was meshed in this search,
+   so exportSTL does not mesh it again.
+   '''
+   if maxTriangles is None and chordError is None :
+      raise ValueError("adaptiveDeflection needs maxTriangles or chordError")
+   if maxTriangles is None : return((chordError, angularDeflection))
+
+   if keep is None : keep = {}
+   key  = shapeHash(shape)
+   ang  = [angularDeflection]
+   last = [None]                 # triangles of the last trial
+   def fits(d):
+      # keep the mesh of the last trial that fits, the one returned
+      trial = {}
+      last[0] = trialCount(shape, d, ang[0], key, trial)
+      ok = last[0] <= maxTriangles
+      if ok :
+         keep.clear()
+         keep.update(trial)
+      return(ok)
+   diag = shape.BoundBox.DiagonalLength
+   d0   = chordError if chordError is not None else LINEAR_DEFLECTION
+
+   def search():
+      # linear deflection at angular deflection ang[0], None if none fits
+      d = d0
+      if fits(d) :
+         if chordError is not None or not refine : return(d)
+         lo, hi = d / 4.0, d
+         while fits(lo) and lo > diag * 1e-5 : lo, hi = lo / 4.0, lo
+         if fits(lo) : return(lo)
+      else :
+         lo, hi = d, d * 4.0
+         while not fits(hi) and hi < diag : lo, hi = hi, hi * 4.0
+         if not fits(hi) : return(None)
+      # fits(hi) and not fits(lo)
+      while hi / lo > step :
+         mid = (lo * hi) ** 0.5
+         if fits(mid) : hi = mid
+         else : lo = mid
+      return(hi)
+
+   while True :
+      d = search()
+      if d is not None : return((d, ang[0]))
+      if ang[0] >= MAX_ANGULAR_DEFLECTION :
+         raise ValueError("no deflection meets maxTriangles=%d, the coarsest mesh "
+                          "has %d triangles" % (maxTriangles, last[0]))
+      ang[0] = min(2.0 * ang[0], MAX_ANGULAR_DEFLECTION)
+
+
+def exportSTL(shape, filename, linearDeflection=LINEAR_DEFLECTION,
+              angularDeflection=ANGULAR_DEFLECTION, relative=RELATIVE,
+              maxTriangles=None, chordError=None, stream=False, workers=1,
+              refine=False):
+   '''
+   Mesh shape and write it to filename as binary STL, once. Returns the
+   number of triangles. With maxTriangles and/or chordError the (absolute)
+   deflections are chosen by adaptiveDeflection instead (refine is passed
+   on, and ValueError raised if maxTriangles cannot be met), and the trial
+   mesh at those deflections is written if the search meshed it.
+   stream=True writes face by face as they are meshed (see faceTriangles),
+   with memory bounded by the largest face (and the face boundaries, kept
+   for the check). This is not the same mesh as the serial export: faces
+   meshed separately may discretize a shared edge differently, leaving
+   cracks, so for a closed shape the face boundaries are checked (see
+   openEdgeCount) and a warning given if they do not join.
+   workers > 1 meshes batches of faces in parallel and welds them into one
+   mesh, stitching shared edges the faces discretized differently (see
+   parallelTriangles). Only if that still leaves a closed shape with open
+   edges is the shape meshed again serially. The speed up has not yet been
+   measured on the repo's parts, so the scripts use the default serial
+   meshing.
+   '''
+   if maxTriangles is not None or chordError is not None :
+      kept = {}
+      d = adaptiveDeflection(shape, maxTriangles, chordError, angularDeflection,
+                             refine=refine, keep=kept)
+      linearDeflection, angularDeflection = d
+      relative = False
+      if d in kept :
+         kept[d].write(Filename=filename)
+         return(kept[d].CountFacets)
+   if stream :
+      from stl_io import writeSTLChunks
+      edges = []
+      def chunks():
+         for t in faceTriangles(shape, linearDeflection, angularDeflection, relative):
+            edges.append(boundaryEdges(t))
+            yield(t)
+      n = writeSTLChunks(filename, chunks())
+      if shape.isClosed() :
+         bad = openEdgeCount(np.concatenate(edges))
+         if bad :
+            warnings.warn("%s: %d open edges, faces meshed separately did not "
+                          "join (stream=False meshes the shape as a whole)"
+                          % (filename, bad))
+      return(n)
+   if workers > 1 and len(shape.Faces) > 1 :
+      from stl_io import writeSTL
+      points, tri = parallelTriangles(shape, workers, linearDeflection,
+                                      angularDeflection, relative)
+      if openEdges(tri) == 0 or not shape.isClosed() :
+         return(writeSTL(filename, points[tri]))
+   m = meshShape(shape, linearDeflection, angularDeflection, relative)
+   m.write(Filename=filename)
+   return(m.CountFacets)
@@ -0,0 +1,95 @@
+# Binary STL read and write with NumPy only (no FreeCAD), for post-processing
+# the STL files in this repo.
+#
+#  tri = readSTL("NiksCubes/moldForSilicone.stl")   # memory-mapped, no copy
+#  tri["vertex"]                                    # (N,3,3) float32
+#  writeSTL("copy.stl", tri["vertex"])
+#  writeSTLChunks("big.stl", chunks)       # chunks of (M,3,3), streamed
+#
+# Binary STL is an 80 byte header, a uint32 triangle count, then per triangle
+# a float32 normal, three float32 vertices and a uint16 attribute, 50 bytes,
+# little endian. FreeCAD writes a header starting "MESH-MESH".
+
+import numpy as np
+
+STL_DTYPE   = np.dtype([("normal", "<f4", (3,)), ("vertex", "<f4", (3, 3)),
+                        ("attr", "<u2")])
+HEADER_SIZE = 80
+
+
+def stlHeader(filename):
+   '''Return the 80 byte header and the triangle count of a binary STL.'''
+   with open(filename, "rb") as f:
+      b = f.read(HEADER_SIZE + 4)
+   if len(b) < HEADER_SIZE + 4 : raise ValueError(str(filename) + " is too short for STL")
+   return(b[:HEADER_SIZE], int(np.frombuffer(b, "<u4", 1, HEADER_SIZE)[0]))
+
+
+def readSTL(filename, mode="r"):
+   '''
+   Memory-map a binary STL as an (N,) STL_DTYPE structured array, with
+   fields "normal" (N,3), "vertex" (N,3,3) and "attr" (N,). Nothing is
+   copied or read until used. mode "r+" allows editing in place.
+   Raises ValueError for ASCII or truncated files.
+   '''
+   header, n = stlHeader(filename)
+   size = np.memmap(filename, dtype=np.uint8, mode="r").size
+   if size != HEADER_SIZE + 4 + n * STL_DTYPE.itemsize :
+      raise ValueError("%s is not binary STL (%d triangles in header, %d bytes)"
+                       % (filename, n, size))
+   if n == 0 : return(np.zeros(0, dtype=STL_DTYPE))
+   return(np.memmap(filename, dtype=STL_DTYPE, mode=mode,
+                    offset=HEADER_SIZE + 4, shape=(n,)))
+
+
+def triangleNormals(vertices):
+   '''(N,3) unit normals of (N,3,3) triangles (right hand rule), 0 if degenerate.'''
+   v = np.asarray(vertices, dtype=np.float64)
+   n = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+   ln = np.linalg.norm(n, axis=1, keepdims=True)
+   return(np.divide(n, ln, out=np.zeros_like(n), where=ln > 0))
+
+
+def stlTriangles(vertices, normals=None):
+   '''(N,) STL_DTYPE array of (N,3,3) vertices, normals computed if not given.'''
+   v = np.asarray(vertices).reshape(-1, 3, 3)
+   tri = np.zeros(len(v), dtype=STL_DTYPE)
+   tri["vertex"] = v
+   tri["normal"] = triangleNormals(v) if normals is None else normals
+   return(tri)
+
+
+def writeSTL(filename, vertices, normals=None, header=b"stl_io.py binary STL"):
+   '''
+   Write (N,3,3) triangle vertices (or an STL_DTYPE array, e.g. from
+   readSTL) to filename as binary STL, the triangles in one tofile call.
+   Returns the number of triangles.
+   '''
+   tri = vertices if getattr(vertices, "dtype", None) == STL_DTYPE else \
+         stlTriangles(vertices, normals)
+   with open(filename, "wb") as f:
+      f.write(header[:HEADER_SIZE].ljust(HEADER_SIZE, b"\0"))
+      f.write(np.uint32(len(tri)).astype("<u4").tobytes())
+      tri.tofile(f)
+   return(len(tri))
+
+
+def writeSTLChunks(filename, chunks, header=b"stl_io.py binary STL"):
+   '''
+   Write binary STL incrementally from an iterable of (M,3,3) triangle
+   vertex chunks (e.g. a generator, one face at a time), so memory is
+   bounded by one chunk however large the part. The triangle count is
+   written as 0 and patched in the header at the end. Returns the number
+   of triangles.
+   '''
+   n = 0
+   with open(filename, "wb") as f:
+      f.write(header[:HEADER_SIZE].ljust(HEADER_SIZE, b"\0"))
+      f.write(b"\0" * 4)
+      for c in chunks:
+         tri = stlTriangles(c)
+         tri.tofile(f)
+         n += len(tri)
+      f.seek(HEADER_SIZE)
+      f.write(np.uint32(n).astype("<u4").tobytes())
+   return(n)